@@ -1,9 +1,17 @@
+from contextlib import contextmanager
+
 import numpy as np
 import pandas as pd
 
-from .indexers import SliceNIndexer, SliceToEndIndexer
 from actymath import columns
-from actymath.exceptions import ActyMathError
+from actymath.columns.interest_rates import forward_rates
+from actymath.columns.sensitivities import derivative
+from actymath.exceptions import ActyMathError, ColumnNotFoundError
+from actymath.grid import term_grid
+from actymath.planner import ancestors, build_plan
+from actymath.profiling import Profile
+from actymath.resolver import ColumnResolver
+from actymath.store import ColumnStore, float_dtype
 
 
 # A dictionary mapping all column names to Column classes - created on the fly at import time
@@ -15,6 +23,9 @@ register = dict(
     ]
 )
 
+# Compiled lookup of column names to Column classes - also built once at import time
+resolver = ColumnResolver(register)
+
 
 class Calc(pd.DataFrame):
     """
@@ -26,30 +37,231 @@ class Calc(pd.DataFrame):
     def _constructor(self):
         return Calc
 
-    _metadata = ["life_count", "term_count", "register"]
+    _metadata = [
+        "life_count",
+        "term_count",
+        "lives",
+        "register",
+        "resolver",
+        "lazy",
+        "profiler",
+        "column_dtype",
+        "horizon",
+        "tail_rates",
+    ]
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self, *args, lazy=False, column_dtype=np.float64, horizon: int = None, **kwargs
+    ):
+        """
+        Params:
+        - lazy (bool) - optional if set to True, reading a registered column that
+          does not exist yet will populate it (and its dependencies) first.  Default is False.
+        - column_dtype - precision the columns are stored in, np.float64 or np.float32.  Default is np.float64.
+          Sums and products along the columns are still accumulated in float64.
+        - horizon (int) - optional last period to calculate.  Lives added are cut to the periods up to
+          the horizon and the sums after it are added exactly from the rest of their q(x).  Default is None.
+        """
         super().__init__(*args, **kwargs)
         self.life_count = 0
         self.term_count = 0
+        self.lives = {}  # Life identifier -> age and the table the life was added from
         self.register = register
+        self.resolver = resolver
+        self.lazy = lazy
+        self.profiler = None  # Profile recording the columns populated, set by profile()
+        self.column_dtype = float_dtype(column_dtype)
+        self.horizon = horizon
+        self.tail_rates = np.empty(0)  # Interest rates for the periods after the end of the Calc
+        # Float buffer behind the columns, and the pandas manager built from it.
+        # Set directly so they are not copied to new frames like _metadata.
+        object.__setattr__(self, "_store", None)
+        object.__setattr__(self, "_store_mgr", None)
+
+    def __getitem__(self, key):
+        if getattr(self, "lazy", False) and isinstance(key, (str, list)):
+            names = [key] if isinstance(key, str) else key
+            missing = [
+                name
+                for name in names
+                if isinstance(name, str)
+                and name not in self.columns
+                and self.resolver.resolve(name) is not None
+            ]
+            if missing:
+                try:
+                    plan = self.plan(missing)
+                except ActyMathError as error:
+                    # Not a column this Calc can calculate - a KeyError like any missing column
+                    raise ColumnNotFoundError(str(error)) from error
+                plan.execute()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        """ Numeric columns are written straight into their slot of the column store. """
+        if isinstance(key, str):
+            values = self._store_values(value)
+            if values is not None and self._store_ready():
+                self._store.set(key, values)
+                self._use_store()
+                return
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if isinstance(key, str) and self._store_ready() and key in self._store:
+            self._store.delete([key])
+            self._use_store()
+            return
+        super().__delitem__(key)
+
+    def _store_values(self, value):
+        """ Returns the value in the precision of the column store, or None if it cannot be stored. """
+        if isinstance(value, pd.DataFrame):
+            return None
+        if len(self.columns) == 0 and len(self.index) == 0 and np.ndim(value) == 1:
+            # The first column sets the index, as it does for an empty DataFrame
+            index = value.index if isinstance(value, pd.Series) else pd.RangeIndex(len(value))
+            object.__setattr__(self, "_store", ColumnStore(len(index), dtype=self._column_dtype()))
+            object.__setattr__(self, "_store_mgr", None)
+            self._use_store(index)
+        if isinstance(value, pd.Series):
+            if not value.index.equals(self.index):
+                value = value.reindex(self.index)
+            value = value.to_numpy()
+        value = np.asarray(value)
+        if value.dtype.kind not in "iuf":
+            return None
+        if value.ndim == 1 and len(value) != len(self.index) or value.ndim > 1:
+            return None
+        return value.astype(self._column_dtype(), copy=False)
+
+    def _set_scaled(self, key: str, values, scale: float):
+        """ Sets the column to the values multiplied by scale, writing the product straight into the column store. """
+        if self._store_ready() and len(values) == len(self.index):
+            self._store.set(key, values, scale)
+            self._use_store()
+        else:
+            self[key] = values * scale
+
+    def _column_dtype(self):
+        # Frames pandas creates without calling __init__ use the default
+        return getattr(self, "column_dtype", np.dtype(np.float64))
 
-    def add_life(self, age: int, qx: list):
+    def _store_ready(self):
+        """ Checks the column store still matches the frame, rebuilding it if the frame was changed elsewhere. """
+        store = getattr(self, "_store", None)
+        if getattr(self, "_store_mgr", None) is self._mgr:
+            if store is None:
+                return False
+            # pandas can also add columns in place, e.g. insert(), which adds a block
+            if (
+                self._mgr.nblocks <= 1
+                and len(self._mgr.items) == len(store)
+                and store.dtype == self._column_dtype()
+            ):
+                return True
+        columns = list(self.columns)
+        frame = pd.DataFrame(self)
+        if len(set(columns)) != len(columns) or not all(
+            isinstance(name, str) and dtype.kind in "iuf"
+            for name, dtype in zip(columns, frame.dtypes)
+        ):
+            # Not all numeric - use pandas until the frame changes again
+            object.__setattr__(self, "_store", None)
+            object.__setattr__(self, "_store_mgr", self._mgr)
+            return False
+        store = ColumnStore(
+            len(self.index), capacity=max(32, 2 * len(columns)), dtype=self._column_dtype()
+        )
+        for position, name in enumerate(columns):
+            store.set(name, frame.iloc[:, position].to_numpy(dtype=store.dtype))
+        object.__setattr__(self, "_store", store)
+        self._use_store()
+        return True
+
+    def _use_store(self, index=None):
+        """ Points the frame at the columns in the store, without copying them. """
+        frame = self._store.frame(self.index if index is None else index)
+        object.__setattr__(self, "_mgr", frame._mgr)
+        self._clear_item_cache()
+        object.__setattr__(self, "_store_mgr", self._mgr)
+
+    def add_life(
+        self, age: int, qx: list = None, table=None, select=True, base: float = None
+    ):
         """
         Add a life and their mortality to the Calc.
 
         Params:
         - age (int) - Age of life at the start
         - qx (list) - list of q(x) values for this life starting at starting age
+        - table (MortalityTable) - optional table to read q(x) from instead of providing qx.
+          Lives added from a table share commutation columns with other Calcs through the cache.
+        - select (bool) - use select mortality when reading from a table.  Default is True.
+        - base (float) - starting value of l(x) for the life.  Default is 34481.408.
+
+        q(x) after the end of the Calc (or the horizon) is kept to add the sums after the end exactly.
 
         Returns:
         - Life identifier / column name
         """
+        if (qx is None) == (table is None):
+            raise ActyMathError("Specify either qx or a mortality table for the life")
+        if table is not None:
+            qx = table.qx(age, select=select)
+        qx, tail_qx = self._split_qx(qx)
         self.life_count += 1
+        self._own_lives()
+        self.lives[self.life_count] = {
+            "age": age,
+            "table": table,
+            "select": select,
+            "base": columns.l_x.base if base is None else base,
+            "tail_qx": tail_qx,  # q(x) for the periods after the end of the Calc
+        }
         column = columns.q_x.populate(calc=self, life=self.life_count, qx=qx)
         column = columns.Age.populate(calc=self, life=self.life_count, age=age)
         return column
 
+    def _own_lives(self):
+        """
+        Copies the lives before changing them.  Copies of a Calc share the lives through
+        _metadata, so changing them in place would change the other Calcs too.
+        """
+        self.lives = {life: dict(values) for life, values in self.lives.items()}
+
+    def _split_qx(self, qx):
+        """ Splits q(x) into the values for the rows of the Calc and the values after its end. """
+        rows = len(self.index)
+        if rows == 0:
+            rows = len(qx) if self.horizon is None else min(len(qx), self.horizon + 1)
+        tail_qx = np.asarray(qx[rows:], dtype=np.float64)
+        return qx[:rows], tail_qx[~np.isnan(tail_qx)]
+
+    def basis(self, life: int):
+        """
+        Returns a hashable key for everything the commutation columns of the life depend on -
+        table, age, select, interest rate, projection length and l(x) base.
+        The interest rate is a float when fixed, or a tuple of the rate for each period.
+        Returns None if the life was not added from a table.
+        """
+        table = self.lives.get(life, {}).get("table")
+        if table is None or "i" not in self.columns:
+            return None
+        rates = np.concatenate([self["i"].to_numpy(), self.tail_rates])
+        if len(rates) and (rates == rates[0]).all():
+            rate = float(rates[0])
+        else:
+            rate = tuple(rates.tolist())
+        return (
+            table.cache_key,
+            self.lives[life]["age"],
+            self.lives[life]["select"],
+            rate,
+            len(self.index),
+            self.lives[life]["base"],
+        )
+
     def add_term(self, n: int):
         """
         Add a term (n) to the Calc.
@@ -60,46 +272,293 @@ class Calc(pd.DataFrame):
         Returns:
         - Term identifier / column name
         """
+        self._check_term(n, self.horizon)
         self.term_count += 1
         column = columns.n.populate(calc=self, term_id=self.term_count, n=n)
         return column
 
-    def add_i(self, rate: float):
+    def _check_term(self, n, horizon):
+        """ Checks a term ends before the horizon, as the term columns use the period after the term. """
+        if horizon is not None and n > horizon - 1:
+            raise ActyMathError(
+                f"Term ({n:g}) is too long for the horizon ({horizon}) - the longest term is {horizon - 1}"
+            )
+
+    def add_i(self, rate=None, spot=None):
         """
-        Add the fixed interest rate to the Calc.
+        Add the interest rate to the Calc, either fixed, as a rate for each period or from a spot curve.
 
         Params:
-        - rate (float) - the interest rate per period, fixed through the term.
+        - rate (float or list) - the interest rate per period, fixed through the term, or a list
+          of rates for each period from t=0 (the rate at t applies from t to t+1)
+        - spot (list) - alternative to rate, spot rates for maturities of 1, 2, 3, ... periods
+
+        Rate lists shorter than the Calc continue at the last rate.  Spot curves continue at the last spot rate.
+        Rates after the end of the Calc are kept for the sums after the end.
         """
-        self["i"] = rate
+        if (rate is None) == (spot is None):
+            raise ActyMathError("Specify either rate or spot for the interest rate")
+        if spot is not None:
+            spot = np.asarray(spot, dtype=np.float64)
+            extra = max(len(self.index) - len(spot), 0)
+            rate = forward_rates(np.concatenate([spot, np.full(extra, spot[-1])]))
+        self.tail_rates = np.empty(0)
+        if np.ndim(rate) == 0:
+            self["i"] = rate
+            return
+        rate = np.asarray(rate, dtype=np.float64)
+        if len(rate) == 0:
+            raise ActyMathError("The list of interest rates is empty")
+        extra = max(len(self.index) - len(rate), 0)
+        self["i"] = np.concatenate([rate, np.full(extra, rate[-1])])[: len(self.index)]
+        self.tail_rates = rate[len(self.index) :].copy()
+
+    def set_i(self, rate=None, spot=None):
+        """
+        Changes the interest rate and drops the columns that depend on it.
+        Dropped columns are recalculated when next populated.
+
+        Params:
+        - rate (float or list) - the new interest rate per period, fixed or for each period
+        - spot (list) - alternative to rate, spot rates for maturities of 1, 2, 3, ... periods
+
+        Returns:
+        - List of the columns dropped
+        """
+        self.add_i(rate=rate, spot=spot)
+        return self.invalidate("i")
+
+    def update_life(self, life: int, qx: list = None, age: int = None):
+        """
+        Changes the mortality or age of a life and drops the columns that depend on it.
+        Columns for other lives are kept.  Dropped columns are recalculated when next populated.
+
+        Params:
+        - life (int) - Life identifier
+        - qx (list) - optional new list of q(x) values starting at starting age
+        - age (int) - optional new age of life at the start
+
+        Returns:
+        - List of the columns dropped
+        """
+        if life < 1 or life > self.life_count:
+            raise ActyMathError(f"Life ({life}) has not been added to the Calc")
+        dropped = []
+        self._own_lives()
+        self.lives[life]["table"] = None  # No longer matches the table basis
+        if qx is not None:
+            qx, self.lives[life]["tail_qx"] = self._split_qx(qx)
+            columns.q_x.populate(calc=self, force=True, life=life, qx=qx)
+            dropped += self.invalidate(columns.q_x.column(life=life))
+        if age is not None:
+            self.lives[life]["age"] = age
+            columns.Age.populate(calc=self, force=True, life=life, age=age)
+            dropped += self.invalidate(columns.Age.column(life=life))
+        return dropped
+
+    def update_term(self, term_id: int, n: int):
+        """
+        Changes a term and drops the columns that depend on it.
+        Columns for other terms are kept.  Dropped columns are recalculated when next populated.
+
+        Params:
+        - term_id (int) - Term identifier
+        - n (int) - New term in periods.
+
+        Returns:
+        - List of the columns dropped
+        """
+        if term_id < 1 or term_id > self.term_count:
+            raise ActyMathError(f"Term ({term_id}) has not been added to the Calc")
+        self._check_term(n, self.horizon)
+        columns.n.populate(calc=self, force=True, term_id=term_id, n=n)
+        return self.invalidate(columns.n.column(term_id=term_id))
+
+    def dependents(self, column: str):
+        """ Returns the columns in the Calc that are derived from this column, directly or indirectly. """
+        memo = {}
+        return [
+            name
+            for name in self.columns
+            if column in ancestors(self.resolver, name, memo)
+        ]
+
+    def invalidate(self, column: str):
+        """
+        Drops every column in the Calc derived from this column, so they are recalculated when next populated.
+
+        Params:
+        - column (str) - the name of the column that has changed
+
+        Returns:
+        - List of the columns dropped
+        """
+        dropped = self.dependents(column)
+        self._delete_columns(dropped)
+        return dropped
+
+    def _column_bytes(self):
+        """ Bytes allocated for the columns, including the spare capacity of the column store. """
+        if self._store_ready():
+            return self._store.nbytes
+        return int(self.memory_usage(index=False).sum())
+
+    def _delete_columns(self, names: list):
+        """ Drops the columns, freeing them from the column store. """
+        if self._store_ready():
+            self._store.delete(names)
+            self._use_store()
+        else:
+            self.drop(columns=names, inplace=True)
+
+    def set_horizon(self, horizon: int = None):
+        """
+        Cuts the Calc to the periods up to the horizon, so columns calculated after are shorter.
+        The q(x) and interest rates after the horizon are kept, and the commutation sums (M, N, R, S)
+        add the part after the horizon exactly, so values within the horizon are unchanged.
+        Columns that need the next period (e.g. a(x)) are NaN in the last row.
+
+        Params:
+        - horizon (int) - the last period to keep.  Default is the longest term plus one,
+          the last period used by the term columns.
+
+        Returns:
+        - Number of rows in the Calc
+        """
+        if horizon is None:
+            terms = [self[f"n{term_id}"].iloc[0] for term_id in range(1, self.term_count + 1)]
+            if not terms:
+                raise ActyMathError("Add a term or give the horizon to cut the Calc to")
+            horizon = int(max(terms)) + 1
+        if horizon < 1:
+            raise ActyMathError(f"Horizon ({horizon}) must be at least 1")
+        for term_id in range(1, self.term_count + 1):
+            self._check_term(self[f"n{term_id}"].iloc[0], horizon)
+        self.horizon = horizon
+        rows = horizon + 1
+        if rows >= len(self.index):
+            return len(self.index)
+
+        self._own_lives()
+        for life in range(1, self.life_count + 1):
+            q = self[columns.q_x.column(life=life)].to_numpy(dtype=np.float64)
+            tail_qx = np.concatenate([q[rows:], self.lives[life].get("tail_qx", [])])
+            self.lives[life]["tail_qx"] = tail_qx[~np.isnan(tail_qx)]
+        if "i" in self.columns:
+            self.tail_rates = np.concatenate(
+                [self["i"].to_numpy(dtype=np.float64)[rows:], self.tail_rates]
+            )
+
+        index = self.index[:rows]
+        if self._store_ready():
+            self._store.truncate(rows)
+            self._use_store(index)
+        else:
+            object.__setattr__(self, "_mgr", self.iloc[:rows].copy()._mgr)
+            self._clear_item_cache()
+        return rows
+
+    def term_grid(self, factor: str, life: int = 1, max_n: int = None):
+        """
+        Returns a term factor for every term n = 1..max_n in one pass, without adding the terms.
+
+        Params:
+        - factor (str) - the term factor e.g. "a_due", "A", "EA", "NP", "IA"
+        - life (int) - Life identifier.  Default is 1.
+        - max_n (int) - the longest term.  Default is the length of the Calc less one.
+
+        Returns:
+        - DataFrame with a row for each t and a column for each n, zero after the end of each term
+        """
+        return term_grid(self, factor, life=life, max_n=max_n)
 
     @property
     def formulae(self):
         """ Returns a dictionary of the potential column names registered and description of the column (from the docstring). """
         return {k: v.__doc__ for k, v in self.register.items()}
 
-    def populate(self, column: str, force=False):
+    def plan(self, columns, force=False, keep="all"):
+        """
+        Plans the columns to calculate, including any dependencies, without calculating them.
+
+        Params:
+        - columns (str or list of str) - the names of the columns required
+        - force (bool) - optional if set to True will plan a recalculation of all dependent columns.  Default is False.
+        - keep (str) - the columns calculated to keep: "all", "outputs" for only the columns requested,
+          or a regular expression for other columns to keep as well e.g. "D\\(x1\\)".  Default is "all".
+
+        Returns:
+        - Plan with each column to calculate once, in dependency order
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        return build_plan(self, columns, force=force, keep=keep)
+
+    def explain(self, columns, force=False, keep="all"):
+        """
+        Prints the plan for populating the columns with its estimated cost and peak memory.
+
+        Params:
+        - columns (str or list of str) - the names of the columns required
+        - force (bool) - optional if set to True will plan a recalculation of all dependent columns.  Default is False.
+        - keep (str) - the columns calculated to keep: "all", "outputs" for only the columns requested,
+          or a regular expression for other columns to keep as well e.g. "D\\(x1\\)".  Default is "all".
+
+        Returns:
+        - Plan that would be executed by populate
+        """
+        plan = self.plan(columns, force=force, keep=keep)
+        print(plan.explain())
+        return plan
+
+    def populate(self, column, force=False, keep="all"):
         """
         Populates a particular column in the Calc dataframe, including any dependencies.
+        Dependencies shared between columns are only calculated once.
+        With keep set, intermediate columns are dropped once the last column needing them is calculated.
 
         Params:
-        - column (str) - the name of the column to fetch and calculate
+        - column (str or list of str) - the name of the column to fetch and calculate, or a list of names
         - force (bool) - optional if set to True will force a recalculation of all dependent columns.  Default is False.
+        - keep (str) - the columns calculated to keep: "all", "outputs" for only the columns requested,
+          or a regular expression for other columns to keep as well e.g. "D\\(x1\\)".  Default is "all".
         """
-        if column in self.register:
-            # Fetch class directly
-            class_ = self.register[column]
-            class_.populate(calc=self, force=force)
-            return
-        else:
-            # Parse name and kwargs from the column names
-            for class_ in self.register.values():
-                result = class_.parse_column(column)
-                if result is not None:
-                    kwargs = result[1]
-                    class_.populate(calc=self, force=force, **kwargs)
-                    return
-
-        raise ActyMathError(
-            f"Unable to populate column ({column}) - does the class for this column exist?"
-        )
\ No newline at end of file
+        self.plan(column, force=force, keep=keep).execute()
+
+    def sensitivity(self, column: str, order: int = 1):
+        """
+        Populates and returns the derivative of a column with respect to a parallel shift in the interest rate.
+        The derivative columns are named like dA(x1)[n1]/di and d2A(x1)[n1]/di2.
+
+        Params:
+        - column (str) - the name of the column e.g. "a_due(x1)[n1]"
+        - order (int) - 1 for the first derivative or 2 for the second derivative.  Default is 1.
+
+        Returns:
+        - Series of the derivative
+        """
+        if order not in (1, 2):
+            raise ActyMathError(f"Only first and second derivatives are available, not ({order})")
+        name = derivative(column, order)
+        self.populate(name)
+        return self[name]
+
+    @contextmanager
+    def profile(self):
+        """
+        Context manager that records the time and counts for each column populated inside it.
+
+            with calc.profile() as profile:
+                calc.populate("A(x1)[n1]")
+            profile.to_frame()  # Or profile.to_frame(by="class")
+
+        Yields:
+        - Profile of the columns populated
+        """
+        previous = self.profiler
+        self.profiler = Profile()
+        try:
+            yield self.profiler
+        finally:
+            self.profiler.stop()
+            self.profiler = previous
@@ -1,5 +1,58 @@
 # Put the more specific imports at the top to avoid parse collisions
 
+from .sensitivities import (
+    da_due_x_n,
+    d2a_due_x_n,
+    da_x_n,
+    d2a_x_n,
+    dA_x_n,
+    d2A_x_n,
+    dE_x_n,
+    d2E_x_n,
+    dEA_x_n,
+    d2EA_x_n,
+    dNP_x_n,
+    d2NP_x_n,
+    dIa_due_x_n,
+    d2Ia_due_x_n,
+    dIa_x_n,
+    d2Ia_x_n,
+    dIA_x_n,
+    d2IA_x_n,
+    dIE_x_n,
+    d2IE_x_n,
+    dIAE_x_n,
+    d2IAE_x_n,
+    da_due_x,
+    d2a_due_x,
+    da_x,
+    d2a_x,
+    dA_x,
+    d2A_x,
+    dNP_x,
+    d2NP_x,
+    dIa_due_x,
+    d2Ia_due_x,
+    dIa_x,
+    d2Ia_x,
+    dIA_x,
+    d2IA_x,
+    dv,
+    d2v,
+    dCx,
+    d2Cx,
+    dDx,
+    d2Dx,
+    dMx,
+    d2Mx,
+    dNx,
+    d2Nx,
+    dRx,
+    d2Rx,
+    dSx,
+    d2Sx,
+)
+
 from .term import (
     a_due_x_n,
     a_x_n,
@@ -1,5 +1,7 @@
 from abc import ABC, abstractclassmethod
+from functools import partial
 
+import numpy as np
 import pandas as pd
 import parse
 from actymath.exceptions import ActyMathError
@@ -12,6 +14,8 @@ class Column:
     parameters = {}  # Required kwargs parameters for populating this Column.
     column_name = "overwrite_me({kwarg})"
     dependencies = []  # List of column names required for calculation
+    input = False  # True for columns added to the Calc from user inputs rather than calculated
+    cost = 1  # Relative cost per row of calculating this column, used to explain plans
 
     @classmethod
     def column(cls, **kwargs):
@@ -37,6 +41,14 @@ class Column:
         """
         raise ActyMathError(f"Calculate method for {cls} not yet implemented.")
 
+    @classmethod
+    def float64(cls, calc, **kwargs):
+        """
+        Returns the column calculated again in float64, for formulae that need more precision
+        than a float32 Calc stores.  Returns None to read the stored column (see read).
+        """
+        return None
+
     @classmethod
     def populate(cls, calc, force=False, **kwargs):
         """ Populates this object and any dependencies in the Grid DataFrame. """
@@ -49,26 +61,94 @@ class Column:
                 )
 
         # If column already exists then skip
-        if cls.column(**kwargs) in calc.columns and force is False:
+        new_column = cls.column(**kwargs)
+        if new_column in calc.columns and force is False:
             return
 
-        # First check dependencies exist and if not, then create them, first
-        for column_name in cls.dependencies:
-            column = column_name.format(**kwargs)
-            if column not in calc.columns or force is True:
-                calc.populate(column, force=force)
-                # try:
-                #     class_ = calc.register[column_name]
-                #     class_.populate(calc, force=force, **kwargs)
-                # except Exception as e:
-                #     raise ActyMathError(
-                #         f"Unable to populate dependency column ({column_name}) - does the class for this column exist? - {e}"
-                #     )
-
-        # Calculate pandas series and insert in a new column
+        # Columns with dependencies are planned so shared dependencies are only calculated once
+        if cls.dependencies:
+            calc.populate(new_column, force=force)
+        else:
+            cls.insert(calc, **kwargs)
+
+        return new_column
+
+    @classmethod
+    def lookup(cls, calc, **kwargs):
+        """
+        Returns previously calculated values for this column if they are available elsewhere (e.g. a cache).
+        Returns None if the column must be calculated.
+        """
+        return None
+
+    @classmethod
+    def insert(cls, calc, **kwargs):
+        """ Calculates this column and inserts it in the Calc.  Dependencies must already exist. """
+        return cls.write(calc, cls.calculate(calc, **kwargs), **kwargs)
+
+    @classmethod
+    def write(cls, calc, values, **kwargs):
+        """ Inserts the values for this column in the Calc. """
         new_column = cls.column(**kwargs)
-        calc[new_column] = cls.calculate(calc, **kwargs)
         if cls.default is not None:
-            calc[new_column].fillna(0, inplace=True)
+            # Align to the Calc first so rows missing from the values also take the default
+            if isinstance(values, pd.Series):
+                values = values.reindex(calc.index).fillna(cls.default)
+            elif isinstance(values, np.ndarray):
+                values = np.where(np.isnan(values), cls.default, values)
+        calc[new_column] = values
 
         return new_column
+
+
+def read(calc, column: str):
+    """
+    Returns a column of the Calc for a formula.  In a float32 Calc the sums to the end
+    (M, N, R, S and their derivatives) are summed again in float64, so differences such as
+    M(x) - M(x+n) are taken before the result is rounded to float32.
+    """
+    if calc._column_dtype() != np.float64:
+        resolved = calc.resolver.resolve(column)
+        if resolved is not None:
+            values = resolved[0].float64(calc, **resolved[1])
+            if values is not None:
+                return values
+    return calc[column]
+
+
+class RatioColumn(Column):
+    """
+    An abstract class for columns calculated as a numerator divided by a denominator,
+    e.g. (N(x) - N(x+n)) / D(x).  Keeping them apart lets the interest rate
+    sensitivities differentiate the column with the quotient rule.
+    """
+
+    @classmethod
+    def numerator(cls, calc, value, **kwargs):
+        """
+        Returns the numerator, reading each column it needs with value(column name).
+        Must be linear in the columns read so it can be differentiated column by column.
+        """
+        raise ActyMathError(f"Numerator method for {cls} not yet implemented.")
+
+    @classmethod
+    def denominator(cls, calc, value, **kwargs):
+        """
+        Returns the denominator, reading each column it needs with value(column name).
+        Default is D(x).  Return None for columns that are a sum rather than a ratio.
+        """
+        return value(f"D(x{kwargs['life']})")
+
+    @classmethod
+    def limit(cls, calc, values, **kwargs):
+        """ Applies any final adjustment to the ratio, e.g. stopping at the end of a term. """
+        return values
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        value = partial(read, calc)
+        values = cls.numerator(calc, value, **kwargs)
+        denominator = cls.denominator(calc, value, **kwargs)
+        if denominator is not None:
+            values = values / denominator
+        return cls.limit(calc, values, **kwargs)
@@ -1,31 +1,222 @@
+from collections import OrderedDict, namedtuple
+
+import numpy as np
 import pandas as pd
 
 from .base import Column
-from actymath.indexers import SliceToEndIndexer
+from actymath.tables import OneDimensionTableMixIn
+from actymath.kernels import discount_factors, shift, tail_sum
 from actymath.exceptions import ActyMathError
 
 """ Commutation functions. """
 
-# Indexers to perform Pandas slice operations
-indexer_to_end = SliceToEndIndexer()
+# A read only view of a CommutationTable column and the factor to scale it by when written
+Scaled = namedtuple("Scaled", ["values", "scale"])
 
 
-class Cx(Column):
-    """ Commutation factor Cx. """
+def remainder(calc, life: int, order: int = 0):
+    """
+    Values after the end of the Calc for a life whose q(x) runs on past it (see Calc.set_horizon).
+
+    Params:
+    - calc (Calc) - the Calc
+    - life (int) - Life identifier
+    - order (int) - 0 for the values, or 1 or 2 for their derivatives with respect to the interest rate
+
+    Returns:
+    - (v, D, C) - v^t for the first period after the Calc and arrays of D(x) and C(x) from
+      that period to the end of the life, or None if the life ends within the Calc
+    """
+    tail_qx = calc.lives.get(life, {}).get("tail_qx")
+    if tail_qx is None or len(tail_qx) == 0:
+        return None
+    q = calc[f"q(x{life})"].to_numpy(dtype=np.float64)
+    rates = calc["i"].to_numpy(dtype=np.float64)
+    tail_rates = np.asarray(getattr(calc, "tail_rates", []), dtype=np.float64)[: len(tail_qx)]
+    last_rate = tail_rates[-1] if len(tail_rates) else rates[-1]
+    rates = np.concatenate(
+        [rates, tail_rates, np.full(len(tail_qx) - len(tail_rates), last_rate)]
+    )
+    length = len(q)
+
+    survivors = np.empty(len(tail_qx))
+    survivors[0] = calc.lives[life].get("base", 1.0) * np.prod(1 - q)
+    survivors[1:] = 1 - tail_qx[:-1]
+    survivors = np.cumprod(survivors)
+    v = discount_factors(np.concatenate([rates, [0.0]]))[length:]  # v^t from the end of the Calc
+    if order > 0:
+        # Parallel shift in every rate - see the sensitivities columns
+        w = np.concatenate([[0.0], np.cumsum(1 / (1 + rates))])[length:]
+        u = np.concatenate([[0.0], np.cumsum((1 + rates) ** -2)])[length:]
+        v = -v * w if order == 1 else v * (w ** 2 + u)
+    D = v[:-1] * survivors
+    C = v[1:] * survivors * tail_qx
+    C[-1] = np.nan  # Matches d(x) for the last row of a life
+    return v[0], D, C
+
+
+def tail_sums(calc, life: int, order: int = 0):
+    """
+    Returns a dictionary of the parts of M, N, R and S (or their derivatives) from after the end
+    of the Calc, to add to the sums over the Calc.  All zero if the life ends within the Calc.
+    """
+    values = remainder(calc, life, order)
+    if values is None:
+        return dict.fromkeys(["M", "N", "R", "S"], 0.0)
+    _, D, C = values
+    counts = np.arange(1, len(D) + 1)  # Each value after the end appears in this many tail sums
+    return {
+        "M": np.nansum(C),
+        "N": np.nansum(D),
+        "R": np.nansum(counts * C),
+        "S": np.nansum(counts * D),
+    }
+
+
+class CommutationCache:
+    """
+    Process-wide LRU cache of commutation vectors shared between Calcs.
+
+    Vectors are keyed by the basis of the life - the mortality table, entry age,
+    select flag, interest rate, projection length and l(x) base - the column name and the
+    precision the Calc stores its columns in.
+    Lives only have a basis when they are added to a Calc with a table.
+
+    Set max_bytes to limit the memory used.  The least recently used vectors
+    are evicted first.  Set max_bytes to 0 to switch the cache off.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ Returns the cached vector for the key, or None if not cached. """
+        try:
+            values = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return values
+
+    def put(self, key, values):
+        """ Stores a read-only copy of the vector, evicting old vectors to stay in budget. """
+        if key in self._entries or values.nbytes > self.max_bytes:
+            return
+        values = values.copy()
+        values.flags.writeable = False
+        self._entries[key] = values
+        self.nbytes += values.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """ Empties the cache and resets the statistics. """
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def stats(self):
+        """ Returns a dictionary of the cache hit, miss and memory statistics. """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+# Shared by all Calcs in this process
+cache = CommutationCache()
+
+
+class CommutationColumn(Column):
+    """
+    A commutation column for a life that can be shared between Calcs.
+
+    Lives on ultimate mortality read views of the table's CommutationTable.
+    Other lives added from a table share columns through the cache.
+    """
 
     parameters = {"life": "Life identifier (int)"}
+    symbol = None  # Name of the column in a CommutationTable
+
+    @classmethod
+    def lookup(cls, calc, **kwargs):
+        life = int(kwargs["life"])
+        basis = calc.basis(life)
+        if basis is None:
+            return None
+
+        table = calc.lives[life]["table"]
+        _, age, select, rate, length, base = basis
+        fixed_rate = isinstance(rate, float)
+        if fixed_rate and (select is False or isinstance(table, OneDimensionTableMixIn)):
+            offset = table.ultimate_index(age)
+            commutation_table = table.commutation_table(rate)
+            remaining = len(commutation_table) - offset - length
+            if remaining == len(calc.lives[life].get("tail_qx", [])):
+                view, scale = commutation_table.column(cls.symbol, offset, base)
+                return Scaled(view[:length], scale)
+
+        return cache.get((basis, cls.column_name, calc.column_dtype.str))
+
+    @classmethod
+    def write(cls, calc, values, **kwargs):
+        if isinstance(values, Scaled):
+            # Scaled straight from the table view into the Calc, without an intermediate copy
+            new_column = cls.column(**kwargs)
+            calc._set_scaled(new_column, values.values, values.scale)
+            return new_column
+        return super().write(calc, values, **kwargs)
+
+    @classmethod
+    def insert(cls, calc, **kwargs):
+        new_column = super().insert(calc, **kwargs)
+        basis = calc.basis(int(kwargs["life"]))
+        if basis is not None:
+            cache.put((basis, cls.column_name, calc.column_dtype.str), calc[new_column].to_numpy())
+        return new_column
+
+
+class Cx(CommutationColumn):
+    """ Commutation factor Cx. """
+
+    symbol = "C"
     column_name = "C(x{life})"
     dependencies = ["v^t", "d(x{life})"]
 
     @classmethod
     def calculate(cls, calc, **kwargs):
-        return calc["v^t"].shift(-1) * calc[f"d(x{kwargs['life']})"]
+        discount = shift(calc["v^t"].to_numpy())
+        values = remainder(calc, int(kwargs["life"]))
+        if values is not None:
+            discount[-1] = values[0]  # The life runs on past the Calc
+        return pd.Series(
+            discount * calc[f"d(x{kwargs['life']})"].to_numpy(), index=calc.index
+        )
 
 
-class Dx(Column):
+class Dx(CommutationColumn):
     """ Commutation factor Dx. """
 
-    parameters = {"life": "Life identifier (int)"}
+    symbol = "D"
     column_name = "D(x{life})"
     dependencies = ["v^t", "l(x{life})"]
 
@@ -34,52 +225,64 @@ class Dx(Column):
         return calc["v^t"] * calc[f"l(x{kwargs['life']})"]
 
 
-class Mx(Column):
-    """ Commutation factor Mx. """
+class TailSumColumn(CommutationColumn):
+    """ A commutation factor that sums another to the end, e.g. Mx sums Cx. """
 
-    parameters = {"life": "Life identifier (int)"}
-    column_name = "M(x{life})"
-    dependencies = ["C(x{life})"]
+    summed = None  # Commutation factor summed e.g. "C(x{life})" for Mx
+    cost = 3
 
     @classmethod
     def calculate(cls, calc, **kwargs):
-        return calc[f"C(x{kwargs['life']})"].rolling(indexer_to_end).sum()
+        return pd.Series(
+            tail_sum(calc[cls.summed.format(**kwargs)].to_numpy())
+            + tail_sums(calc, int(kwargs["life"]))[cls.symbol],
+            index=calc.index,
+        )
+
+    @classmethod
+    def float64(cls, calc, **kwargs):
+        if cls.summed.format(**kwargs) in calc.columns:
+            return cls.calculate(calc, **kwargs)
+        values = cls.lookup(calc, **kwargs)
+        if isinstance(values, Scaled):
+            return pd.Series(values.values * values.scale, index=calc.index)
+        return None
 
 
-class Nx(Column):
+class Mx(TailSumColumn):
+    """ Commutation factor Mx. """
+
+    symbol = "M"
+    summed = "C(x{life})"
+    column_name = "M(x{life})"
+    dependencies = ["C(x{life})"]
+
+
+class Nx(TailSumColumn):
     """ Commutation factor Nx. """
 
-    parameters = {"life": "Life identifier (int)"}
+    symbol = "N"
+    summed = "D(x{life})"
     column_name = "N(x{life})"
     dependencies = ["D(x{life})"]
 
-    @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"D(x{kwargs['life']})"].rolling(indexer_to_end).sum()
-
 
-class Rx(Column):
+class Rx(TailSumColumn):
     """ Commutation factor Rx. """
 
-    parameters = {"life": "Life identifier (int)"}
+    symbol = "R"
+    summed = "M(x{life})"
     column_name = "R(x{life})"
     dependencies = ["M(x{life})"]
 
-    @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"M(x{kwargs['life']})"].rolling(indexer_to_end).sum()
 
-
-class Sx(Column):
+class Sx(TailSumColumn):
     """ Commutation factor Sx. """
 
-    parameters = {"life": "Life identifier (int)"}
+    symbol = "S"
+    summed = "N(x{life})"
     column_name = "S(x{life})"
     dependencies = ["N(x{life})"]
 
-    @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"N(x{kwargs['life']})"].rolling(indexer_to_end).sum()
-
 
 """ Commutation value at fixed term """
@@ -1,11 +1,26 @@
+import numpy as np
+import pandas as pd
+
 from .base import Column
 from actymath.exceptions import ActyMathError
+from actymath.kernels import discount_factors
+
+
+def forward_rates(spot):
+    """
+    Converts spot rates for maturities 1, 2, 3, ... periods into the interest rate for each period.
+    The rate for period t (from t to t+1) is (1 + s[t+1]) ** (t+1) / (1 + s[t]) ** t - 1.
+    """
+    spot = np.asarray(spot, dtype=np.float64)
+    accumulation = (1 + spot) ** np.arange(1, len(spot) + 1)
+    return accumulation / np.concatenate([[1.0], accumulation[:-1]]) - 1
 
 
 class i(Column):
-    """ Fixed interest rate """
+    """ Interest rate for each period (from t to t+1) """
 
     column_name = "i"
+    input = True
 
     @classmethod
     def calculate(cls, calc, **kwargs):
@@ -22,4 +37,4 @@ class v(Column):
 
     @classmethod
     def calculate(cls, calc, **kwargs):
-        return (1 + calc["i"]) ** (-calc.index)
+        return pd.Series(discount_factors(calc["i"].to_numpy()), index=calc.index)
@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
 
 from .base import Column
 from actymath.exceptions import ActyMathError
 from actymath.indexers import SliceToEndIndexer
+from actymath.kernels import shift
 
 
 """ Base mortality functions. """
@@ -18,6 +20,7 @@ class Age(Column):
         "age": "Age at start of the life (int).",
     }
     column_name = "x{life}"
+    input = True
 
     @classmethod
     def calculate(cls, calc, **kwargs):
@@ -33,6 +36,7 @@ class q_x(Column):
     }
 
     column_name = "q(x{life})"
+    input = True
 
     @classmethod
     def calculate(cls, calc, **kwargs):
@@ -61,20 +65,21 @@ class l_x(Column):
     }
     column_name = "l(x{life})"
     dependencies = ["q(x{life})"]
-
-    # TODO: Set up initial lx value in parameter
+    cost = 2
+    base = 34481.408  # Default starting value for lx
 
     @classmethod
     def calculate(cls, calc, **kwargs):
+        """ Survivors from the base of the life (set with Calc.add_life), in one cumulative product of p(x). """
         if "base" in kwargs:  # Optional starting value for lx
             base = kwargs["base"]
         else:
-            base = 34481.408
-        values = []
-        values.append(base)
-        for i, index in enumerate(calc.index):
-            values.append(values[i] * (1 - calc[f"q(x{kwargs['life']})"].iloc[index]))
-        return pd.Series(values)
+            life = getattr(calc, "lives", {}).get(int(kwargs["life"]), {})
+            base = life.get("base", cls.base)
+        factors = np.empty(len(calc.index))
+        factors[:1] = base
+        factors[1:] = 1 - calc[f"q(x{kwargs['life']})"].to_numpy()[:-1]
+        return pd.Series(np.cumprod(factors), index=calc.index)
 
 
 class d_x(Column):
@@ -84,11 +89,22 @@ class d_x(Column):
         "life": "Life identifier (int)",
     }
     column_name = "d(x{life})"
-    dependencies = ["l(x{life})"]
+    dependencies = ["l(x{life})", "q(x{life})"]
 
     @classmethod
     def calculate(cls, calc, **kwargs):
-        return calc[f"l(x{kwargs['life']})"] - calc[f"l(x{kwargs['life']})"].shift(-1)
+        """
+        Deaths as l(x).q(x), which equals l(x) less l(x+1) without subtracting two close values,
+        so it keeps its precision when the columns are float32.  NaN in the last row of the life
+        as there is no l(x+1), unless the life runs on past the end of the Calc.
+        """
+        life = int(kwargs["life"])
+        values = calc[f"l(x{life})"].to_numpy(dtype=np.float64)
+        deaths = values * calc[f"q(x{life})"].to_numpy(dtype=np.float64)
+        following = shift(values)
+        if len(getattr(calc, "lives", {}).get(life, {}).get("tail_qx", [])):
+            following[-1] = 0.0  # Not NaN - the next l(x) is after the end of the Calc
+        return pd.Series(np.where(np.isnan(following), np.nan, deaths), index=calc.index)
 
 
 # TODO: NOT EFFICIENT OR CORRECT YET
@@ -0,0 +1,322 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .base import Column, read
+from .commutation import remainder, tail_sums
+from actymath.kernels import shift, tail_sum
+from .term import (
+    a_due_x_n,
+    a_x_n,
+    A_x_n,
+    E_x_n,
+    EA_x_n,
+    NP_x_n,
+    Ia_due_x_n,
+    Ia_x_n,
+    IA_x_n,
+    IE_x_n,
+    IAE_x_n,
+)
+from .whole_of_life import a_due_x, a_x, A_x, NP_x, IA_x, Ia_due_x, Ia_x
+
+"""
+Analytic first and second derivatives with respect to the interest rate.
+
+The derivative is for a parallel shift in the interest rate for every period, so
+v^t' = -v^t.w(t) and v^t'' = v^t.(w(t)^2 + u(t)), where w(t) and u(t) are the sums
+of 1 / (1 + i) and 1 / (1 + i)^2 over the periods before t.  The commutation
+columns are linear in v^t so their derivatives use the same formulae with v^t
+replaced by its derivative, and the ratio columns use the quotient rule.
+"""
+
+
+def derivative(column: str, order: int = 1):
+    """ Returns the name of the derivative of a column with respect to the interest rate, e.g. dN(x1)/di or d2N(x1)/di2. """
+    if order == 1:
+        return f"d{column}/di"
+    return f"d{order}{column}/di{order}"
+
+
+def _rate_sums(rates, power):
+    """ Sum of (1 + i) ** -power over the periods before t. """
+    sums = np.zeros(len(rates))
+    sums[1:] = np.cumsum((1 + rates[:-1]) ** -power)
+    return sums
+
+
+class dv(Column):
+    """ First derivative of the discount factor v^t with respect to the interest rate """
+
+    column_name = "dv^t/di"
+    dependencies = ["v^t", "i"]
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        return -calc["v^t"] * _rate_sums(calc["i"].to_numpy(), 1)
+
+
+class d2v(Column):
+    """ Second derivative of the discount factor v^t with respect to the interest rate """
+
+    column_name = "d2v^t/di2"
+    dependencies = ["v^t", "i"]
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        rates = calc["i"].to_numpy()
+        return calc["v^t"] * (_rate_sums(rates, 1) ** 2 + _rate_sums(rates, 2))
+
+
+class dCx(Column):
+    """ First derivative of commutation factor Cx with respect to the interest rate. """
+
+    order = 1
+    parameters = {"life": "Life identifier (int)"}
+    column_name = "dC(x{life})/di"
+    dependencies = ["dv^t/di", "d(x{life})"]
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        discount = shift(calc[derivative("v^t", cls.order)].to_numpy())
+        values = remainder(calc, int(kwargs["life"]), cls.order)
+        if values is not None:
+            discount[-1] = values[0]  # The life runs on past the Calc
+        return pd.Series(
+            discount * calc[f"d(x{kwargs['life']})"].to_numpy(), index=calc.index
+        )
+
+
+class d2Cx(dCx):
+    """ Second derivative of commutation factor Cx with respect to the interest rate. """
+
+    order = 2
+    column_name = "d2C(x{life})/di2"
+    dependencies = ["d2v^t/di2", "d(x{life})"]
+
+
+class dDx(Column):
+    """ First derivative of commutation factor Dx with respect to the interest rate. """
+
+    order = 1
+    parameters = {"life": "Life identifier (int)"}
+    column_name = "dD(x{life})/di"
+    dependencies = ["dv^t/di", "l(x{life})"]
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        return calc[derivative("v^t", cls.order)] * calc[f"l(x{kwargs['life']})"]
+
+
+class d2Dx(dDx):
+    """ Second derivative of commutation factor Dx with respect to the interest rate. """
+
+    order = 2
+    column_name = "d2D(x{life})/di2"
+    dependencies = ["d2v^t/di2", "l(x{life})"]
+
+
+class TailSumDerivative(Column):
+    """ An abstract class for the derivative of a commutation factor that sums another to the end. """
+
+    order = 1
+    parameters = {"life": "Life identifier (int)"}
+    symbol = None  # Commutation factor differentiated e.g. "M"
+    summed = None  # Commutation factor summed e.g. "C(x{life})" for Mx
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        column = derivative(cls.summed.format(**kwargs), cls.order)
+        return pd.Series(
+            tail_sum(calc[column].to_numpy())
+            + tail_sums(calc, int(kwargs["life"]), cls.order)[cls.symbol],
+            index=calc.index,
+        )
+
+    @classmethod
+    def float64(cls, calc, **kwargs):
+        if derivative(cls.summed.format(**kwargs), cls.order) in calc.columns:
+            return cls.calculate(calc, **kwargs)
+        return None
+
+
+class dMx(TailSumDerivative):
+    """ First derivative of commutation factor Mx with respect to the interest rate. """
+
+    symbol = "M"
+    summed = "C(x{life})"
+    column_name = "dM(x{life})/di"
+    dependencies = ["dC(x{life})/di"]
+
+
+class d2Mx(TailSumDerivative):
+    """ Second derivative of commutation factor Mx with respect to the interest rate. """
+
+    order = 2
+    symbol = "M"
+    summed = "C(x{life})"
+    column_name = "d2M(x{life})/di2"
+    dependencies = ["d2C(x{life})/di2"]
+
+
+class dNx(TailSumDerivative):
+    """ First derivative of commutation factor Nx with respect to the interest rate. """
+
+    symbol = "N"
+    summed = "D(x{life})"
+    column_name = "dN(x{life})/di"
+    dependencies = ["dD(x{life})/di"]
+
+
+class d2Nx(TailSumDerivative):
+    """ Second derivative of commutation factor Nx with respect to the interest rate. """
+
+    order = 2
+    symbol = "N"
+    summed = "D(x{life})"
+    column_name = "d2N(x{life})/di2"
+    dependencies = ["d2D(x{life})/di2"]
+
+
+class dRx(TailSumDerivative):
+    """ First derivative of commutation factor Rx with respect to the interest rate. """
+
+    symbol = "R"
+    summed = "M(x{life})"
+    column_name = "dR(x{life})/di"
+    dependencies = ["dM(x{life})/di"]
+
+
+class d2Rx(TailSumDerivative):
+    """ Second derivative of commutation factor Rx with respect to the interest rate. """
+
+    order = 2
+    symbol = "R"
+    summed = "M(x{life})"
+    column_name = "d2R(x{life})/di2"
+    dependencies = ["d2M(x{life})/di2"]
+
+
+class dSx(TailSumDerivative):
+    """ First derivative of commutation factor Sx with respect to the interest rate. """
+
+    symbol = "S"
+    summed = "N(x{life})"
+    column_name = "dS(x{life})/di"
+    dependencies = ["dN(x{life})/di"]
+
+
+class d2Sx(TailSumDerivative):
+    """ Second derivative of commutation factor Sx with respect to the interest rate. """
+
+    order = 2
+    symbol = "S"
+    summed = "N(x{life})"
+    column_name = "d2S(x{life})/di2"
+    dependencies = ["d2N(x{life})/di2"]
+
+
+class Sensitivity(Column):
+    """
+    An abstract class for the derivative of a RatioColumn f = X / Y with respect to the interest rate.
+    Uses the quotient rule f' = (X' - f.Y') / Y and f'' = (X'' - 2f'.Y' - f.Y'') / Y,
+    reading X', Y' etc. from the derivatives of the columns in the numerator and denominator.
+    """
+
+    of = None  # The RatioColumn class differentiated
+    order = 1
+
+    @classmethod
+    def calculate(cls, calc, **kwargs):
+        def value(order):
+            return lambda column: read(calc, derivative(column, order))
+
+        values = cls.of.numerator(calc, value(cls.order), **kwargs)
+        denominator = cls.of.denominator(calc, partial(read, calc), **kwargs)
+        if denominator is not None:
+            ratio = calc[cls.of.column(**kwargs)]
+            first_denominator = cls.of.denominator(calc, value(1), **kwargs)
+            if cls.order == 1:
+                values = values - ratio * first_denominator
+            else:
+                first = calc[derivative(cls.of.column(**kwargs), 1)]
+                values = (
+                    values
+                    - 2 * first * first_denominator
+                    - ratio * cls.of.denominator(calc, value(2), **kwargs)
+                )
+            values = values / denominator
+        return cls.of.limit(calc, values, **kwargs)
+
+
+def sensitivity(of, order=1):
+    """
+    Creates the Column class for the first or second derivative of a RatioColumn with respect to the interest rate.
+
+    Params:
+    - of (RatioColumn) - the column to differentiate
+    - order (int) - 1 for the first derivative or 2 for the second derivative.  Default is 1.
+    """
+    differentiable = [name for name in of.dependencies if name != "n{term_id}"]
+    dependencies = [of.column_name] + list(of.dependencies)
+    for name in differentiable:
+        dependencies += [derivative(name, count) for count in range(1, order + 1)]
+    if order == 2:
+        dependencies.append(derivative(of.column_name, 1))
+    description = "First" if order == 1 else "Second"
+    # Named as the module attribute it is assigned to, e.g. da_due_x_n, so it can be pickled
+    name = f"d{of.__name__}" if order == 1 else f"d2{of.__name__}"
+    return type(
+        name,
+        (Sensitivity,),
+        {
+            "__doc__": f" {description} derivative of {of.column_name} with respect to the interest rate. ",
+            "of": of,
+            "order": order,
+            "parameters": of.parameters,
+            "column_name": derivative(of.column_name, order),
+            "dependencies": dependencies,
+            "default": of.default,
+        },
+    )
+
+
+# Term derivatives first to avoid parse collisions with the whole of life columns
+da_due_x_n = sensitivity(a_due_x_n)
+d2a_due_x_n = sensitivity(a_due_x_n, 2)
+da_x_n = sensitivity(a_x_n)
+d2a_x_n = sensitivity(a_x_n, 2)
+dA_x_n = sensitivity(A_x_n)
+d2A_x_n = sensitivity(A_x_n, 2)
+dE_x_n = sensitivity(E_x_n)
+d2E_x_n = sensitivity(E_x_n, 2)
+dEA_x_n = sensitivity(EA_x_n)
+d2EA_x_n = sensitivity(EA_x_n, 2)
+dNP_x_n = sensitivity(NP_x_n)
+d2NP_x_n = sensitivity(NP_x_n, 2)
+dIa_due_x_n = sensitivity(Ia_due_x_n)
+d2Ia_due_x_n = sensitivity(Ia_due_x_n, 2)
+dIa_x_n = sensitivity(Ia_x_n)
+d2Ia_x_n = sensitivity(Ia_x_n, 2)
+dIA_x_n = sensitivity(IA_x_n)
+d2IA_x_n = sensitivity(IA_x_n, 2)
+dIE_x_n = sensitivity(IE_x_n)
+d2IE_x_n = sensitivity(IE_x_n, 2)
+dIAE_x_n = sensitivity(IAE_x_n)
+d2IAE_x_n = sensitivity(IAE_x_n, 2)
+
+da_due_x = sensitivity(a_due_x)
+d2a_due_x = sensitivity(a_due_x, 2)
+da_x = sensitivity(a_x)
+d2a_x = sensitivity(a_x, 2)
+dA_x = sensitivity(A_x)
+d2A_x = sensitivity(A_x, 2)
+dNP_x = sensitivity(NP_x)
+d2NP_x = sensitivity(NP_x, 2)
+dIa_due_x = sensitivity(Ia_due_x)
+d2Ia_due_x = sensitivity(Ia_due_x, 2)
+dIa_x = sensitivity(Ia_x)
+d2Ia_x = sensitivity(Ia_x, 2)
+dIA_x = sensitivity(IA_x)
+d2IA_x = sensitivity(IA_x, 2)
@@ -2,12 +2,27 @@ import pandas as pd
 import numpy as np
 from actymath.exceptions import ActyMathError
 
-from .base import Column
+from .base import RatioColumn
 
 """ Actuarial formulae for term limited life insurance. """
 
 
-class a_due_x_n(Column):
+class TermRatioColumn(RatioColumn):
+    """ An abstract class for ratio columns that stop at the end of the term. """
+
+    @classmethod
+    def location(cls, calc, **kwargs):
+        """ Returns the index of the end of the term, or the locations given for a term grid. """
+        if "location" in kwargs:
+            return kwargs["location"]
+        return int(calc[f"n{kwargs['term_id']}"].get(0))
+
+    @classmethod
+    def limit(cls, calc, values, **kwargs):
+        return values[: cls.location(calc, **kwargs) + 1]
+
+
+class a_due_x_n(TermRatioColumn):
     """ PV of annuity due (paid in advance) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -16,18 +31,14 @@ class a_due_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"N(x{kwargs['life']})"]
-                - calc[f"N(x{kwargs['life']})"].get(location)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"N(x{kwargs['life']})") - value(f"N(x{kwargs['life']})").get(
+            location
+        )
 
 
-class a_x_n(Column):
+class a_x_n(TermRatioColumn):
     """ PV of annuity (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -36,18 +47,14 @@ class a_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"N(x{kwargs['life']})"].shift(-1)
-                - calc[f"N(x{kwargs['life']})"].get(location + 1)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"N(x{kwargs['life']})").shift(-1) - value(
+            f"N(x{kwargs['life']})"
+        ).get(location + 1)
 
 
-class A_x_n(Column):
+class A_x_n(TermRatioColumn):
     """ PV of a term assurance (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -56,18 +63,14 @@ class A_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"M(x{kwargs['life']})"]
-                - calc[f"M(x{kwargs['life']})"].get(location)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"M(x{kwargs['life']})") - value(f"M(x{kwargs['life']})").get(
+            location
+        )
 
 
-class E_x_n(Column):
+class E_x_n(TermRatioColumn):
     """ PV of a pure endowment for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -76,14 +79,12 @@ class E_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            calc[f"D(x{kwargs['life']})"].get(location) / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"D(x{kwargs['life']})").get(location)
 
 
-class EA_x_n(Column):
+class EA_x_n(TermRatioColumn):
     """ PV of an endowment assurance (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -92,19 +93,16 @@ class EA_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
         return (
-            (
-                calc[f"M(x{kwargs['life']})"]
-                - calc[f"M(x{kwargs['life']})"].get(location)
-                + calc[f"D(x{kwargs['life']})"].get(location)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+            value(f"M(x{kwargs['life']})")
+            - value(f"M(x{kwargs['life']})").get(location)
+            + value(f"D(x{kwargs['life']})").get(location)
+        )
 
 
-class NP_x_n(Column):
+class NP_x_n(RatioColumn):
     """ Net Premium a term assurance for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -113,14 +111,19 @@ class NP_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return (
-            calc[f"EA(x{kwargs['life']})[n{kwargs['term_id']}]"]
-            / calc[f"a_due(x{kwargs['life']})[n{kwargs['term_id']}]"]
-        ).replace([np.inf, -np.inf], np.nan)
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"EA(x{kwargs['life']})[n{kwargs['term_id']}]")
 
+    @classmethod
+    def denominator(cls, calc, value, **kwargs):
+        return value(f"a_due(x{kwargs['life']})[n{kwargs['term_id']}]")
+
+    @classmethod
+    def limit(cls, calc, values, **kwargs):
+        return values.replace([np.inf, -np.inf], np.nan)
 
-class Ia_due_x_n(Column):
+
+class Ia_due_x_n(TermRatioColumn):
     """ PV of arithmetically increasing annuity due (paid in advance) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -129,18 +132,14 @@ class Ia_due_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"S(x{kwargs['life']})"]
-                - calc[f"S(x{kwargs['life']})"].get(location)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"S(x{kwargs['life']})") - value(f"S(x{kwargs['life']})").get(
+            location
+        )
 
 
-class Ia_x_n(Column):
+class Ia_x_n(TermRatioColumn):
     """ PV of arithmetically increasing annuity (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -149,18 +148,14 @@ class Ia_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"S(x{kwargs['life']})"].shift(-1)
-                - calc[f"S(x{kwargs['life']})"].get(location + 1)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"S(x{kwargs['life']})").shift(-1) - value(
+            f"S(x{kwargs['life']})"
+        ).get(location + 1)
 
 
-class IA_x_n(Column):
+class IA_x_n(TermRatioColumn):
     """ PV of arithmetically increasing term assurance (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -169,18 +164,14 @@ class IA_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            (
-                calc[f"R(x{kwargs['life']})"]
-                - calc[f"R(x{kwargs['life']})"].get(location)
-            )
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"R(x{kwargs['life']})") - value(f"R(x{kwargs['life']})").get(
+            location
+        )
 
 
-class IE_x_n(Column):
+class IE_x_n(TermRatioColumn):
     """ PV of arithmetically increasing pure endowment (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -189,16 +180,12 @@ class IE_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            calc[f"D(x{kwargs['life']})"].get(location)
-            * location
-            / calc[f"D(x{kwargs['life']})"]
-        )[: location + 1]
+    def numerator(cls, calc, value, **kwargs):
+        location = cls.location(calc, **kwargs)
+        return value(f"D(x{kwargs['life']})").get(location) * location
 
 
-class IAE_x_n(Column):
+class IAE_x_n(RatioColumn):
     """ PV of arithmetically increasing endowment assurance (paid in arrears) for term n. """
 
     parameters = {"life": "Life identifier (int)", "term_id": "Term identifier (int)"}
@@ -207,9 +194,11 @@ class IAE_x_n(Column):
     default = 0
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        location = int(calc[f"n{kwargs['term_id']}"].get(0))
-        return (
-            calc[f"IE(x{kwargs['life']})[n{kwargs['term_id']}]"]
-            + calc[f"IA(x{kwargs['life']})[n{kwargs['term_id']}]"]
-        )
\ No newline at end of file
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"IE(x{kwargs['life']})[n{kwargs['term_id']}]") + value(
+            f"IA(x{kwargs['life']})[n{kwargs['term_id']}]"
+        )
+
+    @classmethod
+    def denominator(cls, calc, value, **kwargs):
+        return None
@@ -23,6 +23,7 @@ class n(Column):
 
     parameters = {"term_id": "Term identifier (int)", "n": "Term in periods (int)"}
     column_name = "n{term_id}"
+    input = True
 
     @classmethod
     def calculate(cls, calc, **kwargs):
@@ -2,12 +2,12 @@ import pandas as pd
 
 from actymath.exceptions import ActyMathError
 
-from .base import Column
+from .base import RatioColumn
 
 """ Actuarial formulae for whole remainder of life. """
 
 
-class a_due_x(Column):
+class a_due_x(RatioColumn):
     """ PV of annuity due (paid in advance) for remainder of life. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -15,11 +15,11 @@ class a_due_x(Column):
     dependencies = ["N(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"N(x{kwargs['life']})"] / calc[f"D(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"N(x{kwargs['life']})")
 
 
-class a_x(Column):
+class a_x(RatioColumn):
     """ PV of annuity (paid in arrears) for remainder of life. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -27,11 +27,11 @@ class a_x(Column):
     dependencies = ["N(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"N(x{kwargs['life']})"].shift(-1) / calc[f"D(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"N(x{kwargs['life']})").shift(-1)
 
 
-class A_x(Column):
+class A_x(RatioColumn):
     """ PV of whole of life assurance paid in arrears. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -39,11 +39,11 @@ class A_x(Column):
     dependencies = ["M(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"M(x{kwargs['life']})"] / calc[f"D(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"M(x{kwargs['life']})")
 
 
-class NP_x(Column):
+class NP_x(RatioColumn):
     """ Net premium for whole of life assurance. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -51,11 +51,15 @@ class NP_x(Column):
     dependencies = ["A(x{life})", "a_due(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"A(x{kwargs['life']})"] / calc[f"a_due(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"A(x{kwargs['life']})")
+
+    @classmethod
+    def denominator(cls, calc, value, **kwargs):
+        return value(f"a_due(x{kwargs['life']})")
 
 
-class Ia_due_x(Column):
+class Ia_due_x(RatioColumn):
     """ PV of arithmetically increasing annuity due (paid in advance) for remainder of life. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -63,11 +67,11 @@ class Ia_due_x(Column):
     dependencies = ["S(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"S(x{kwargs['life']})"] / calc[f"D(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"S(x{kwargs['life']})")
 
 
-class Ia_x(Column):
+class Ia_x(RatioColumn):
     """ PV of arithmetically increasing annuity (paid in arrears) for remainder of life. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -75,11 +79,11 @@ class Ia_x(Column):
     dependencies = ["S(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"S(x{kwargs['life']})"].shift(-1) / calc[f"D(x{kwargs['life']})"]
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"S(x{kwargs['life']})").shift(-1)
 
 
-class IA_x(Column):
+class IA_x(RatioColumn):
     """ PV of arithmetically increasing whole of life assurance paid in arrears. """
 
     parameters = {"life": "Life identifier (int)"}
@@ -87,5 +91,5 @@ class IA_x(Column):
     dependencies = ["R(x{life})", "D(x{life})"]
 
     @classmethod
-    def calculate(cls, calc, **kwargs):
-        return calc[f"R(x{kwargs['life']})"] / calc[f"D(x{kwargs['life']})"]
\ No newline at end of file
+    def numerator(cls, calc, value, **kwargs):
+        return value(f"R(x{kwargs['life']})")
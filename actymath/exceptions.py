@@ -1,5 +1,9 @@
 class ActyMathError(Exception):
     pass
 
+class ColumnNotFoundError(ActyMathError, KeyError):
+    """ A column is not in the Calc and cannot be calculated. """
+    pass
+
 class MortalityTableError(Exception):
     pass
\ No newline at end of file
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from actymath.columns.base import read
+from actymath.exceptions import ActyMathError
+from actymath.kernels import shift
+
+""" Term factors for every term n = 1..N at once, as a (t x n) matrix. """
+
+
+class _Vector(np.ndarray):
+    """
+    A (t x 1) column of a Calc that broadcasts against a (1 x n) row of terms.
+    Supports the Series methods used by the term formulae, so each formula builds
+    the whole grid in one pass.
+    """
+
+    def get(self, location):
+        """ Values at the end of each term as a (1 x n) row, NaN beyond the end of the Calc. """
+        location = np.asarray(location)
+        inside = (location >= 0) & (location < self.shape[0])
+        return np.where(inside, np.asarray(self)[np.where(inside, location, 0), 0], np.nan)
+
+    def shift(self, periods=-1):
+        return shift(np.asarray(self)[:, 0], periods)[:, None].view(_Vector)
+
+
+def term_grid(calc, factor: str, life: int = 1, max_n: int = None):
+    """
+    Returns a term factor for every term n = 1..max_n from the commutation columns.
+
+    Entry [t, n] is the value at time t of the factor for a term of n periods from t=0,
+    the same as the column for a term added with add_term(n).  Entries after the end
+    of the term (t > n) are zero, so the matrix is upper triangular.
+
+    Params:
+    - calc (Calc) - the Calc with the life and interest rate added
+    - factor (str) - the term factor e.g. "a_due", "A", "EA", "NP", "IA"
+    - life (int) - Life identifier.  Default is 1.
+    - max_n (int) - the longest term.  Default is the length of the Calc less one.
+
+    Returns:
+    - DataFrame with a row for each t and a column for each n
+    """
+    if max_n is None:
+        max_n = len(calc.index) - 1
+    if not 1 <= max_n < len(calc.index):
+        raise ActyMathError(
+            f"Terms must be from 1 to the length of the Calc less one ({len(calc.index) - 1})"
+        )
+    result = calc.resolver.resolve(f"{factor}(x{life})[n1]")
+    if result is None:
+        raise ActyMathError(f"Unable to find a term factor ({factor})")
+    class_, kwargs = result
+
+    locations = np.arange(1, max_n + 1)[None, :]
+    grids = {}
+
+    def value(column):
+        resolved = calc.resolver.resolve(column)
+        if resolved is not None and "term_id" in resolved[0].parameters:
+            return grid(*resolved)
+        if column not in calc.columns:
+            calc.populate(column)
+        return read(calc, column).to_numpy(dtype=np.float64)[:, None].view(_Vector)
+
+    def grid(class_, kwargs):
+        if class_ not in grids:
+            kwargs = dict(kwargs, location=locations)
+            values = class_.numerator(calc, value, **kwargs)
+            denominator = class_.denominator(calc, value, **kwargs)
+            if denominator is not None:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = values / denominator
+            values = np.broadcast_to(np.asarray(values), (len(calc.index), max_n))
+            in_term = np.arange(len(calc.index))[:, None] <= locations
+            grids[class_] = np.where(in_term & np.isfinite(values), values, 0.0)
+        return grids[class_].view(_Vector)
+
+    return pd.DataFrame(
+        np.asarray(grid(class_, kwargs)),
+        index=calc.index,
+        columns=pd.RangeIndex(1, max_n + 1, name="n"),
+    )
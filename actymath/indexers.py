@@ -13,7 +13,9 @@ class SliceToEndIndexer(BaseIndexer):
     dataframe['column'].rolling(indexer).sum()
     """
 
-    def get_window_bounds(self, num_values, min_periods, center, closed, step):
+    def get_window_bounds(
+        self, num_values=0, min_periods=None, center=None, closed=None, step=None
+    ):
         start = np.arange(num_values, dtype=np.int64)
         end = np.full(num_values, num_values, dtype=np.int64)
         return start, end
@@ -23,7 +25,8 @@ class SliceNIndexer(BaseIndexer):
     """
     Pandas custom indexer.
 
-    This will return a slice from current index to include N further rows.
+    This will return a slice from current index to include N further rows,
+    cut off at the end of the data.
 
     Params:
     - n - a list or series of N values
@@ -34,17 +37,11 @@ class SliceNIndexer(BaseIndexer):
     dataframe['column'].rolling(indexer).sum()
     """
 
-    def get_window_bounds(self, num_values, min_periods, center, closed):
-        try:
-            offset = self.offset
-        except:
-            offset = 0
-        start = np.empty(num_values, dtype=np.int64)
-        end = np.empty(num_values, dtype=np.int64)
-        for i in range(num_values):
-            start[i] = i + offset
-            if np.isnan(self.n[i]):
-                end[i] = i + offset
-            else:
-                end[i] = i + offset + int(self.n[i])
+    def get_window_bounds(
+        self, num_values=0, min_periods=None, center=None, closed=None, step=None
+    ):
+        offset = getattr(self, "offset", 0)
+        n = np.asarray(self.n, dtype=np.float64)[:num_values]
+        start = np.minimum(np.arange(num_values, dtype=np.int64) + offset, num_values)
+        end = np.minimum(start + np.where(np.isnan(n), 0, n).astype(np.int64), num_values)
         return start, end
@@ -0,0 +1,67 @@
+import numpy as np
+
+"""
+Vectorised array primitives for the column formulae.
+
+They work along the last axis, so the same functions serve a Calc column (1-D)
+and a Portfolio or scenario array (2-D or 3-D).  Missing values follow the
+pandas rolling sum and shift behaviour the columns were built on - NaN is skipped
+in sums (an all-NaN or empty window sums to 0.0) and shifted-in values are NaN.
+
+Values are converted to float64 first, so sums of float32 columns accumulate in float64.
+"""
+
+
+def tail_sum(values):
+    """
+    Sum from each index to the end, skipping NaN.
+    Same as rolling(SliceToEndIndexer()).sum() on a Series, in one reversed cumulative sum.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return np.nancumsum(values[..., ::-1], axis=-1)[..., ::-1]
+
+
+def window_sum(values, n, offset=0):
+    """
+    Sum of the n[i] values starting at index i + offset, skipping NaN.
+    Windows are cut off at the end of the array and a NaN window size gives an empty window.
+    Same as rolling(SliceNIndexer) on a Series, using the difference of cumulative sums.
+
+    Params:
+    - values (array) - the values to sum
+    - n (int or array) - the number of values in each window
+    - offset (int) - added to the start of each window.  Default is 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = values.shape[-1]
+    cumulative = np.zeros(values.shape[:-1] + (length + 1,))
+    cumulative[..., 1:] = np.nancumsum(values, axis=-1)
+    n = np.broadcast_to(np.asarray(n, dtype=np.float64), (length,))
+    start = np.clip(np.arange(length) + offset, 0, length)
+    end = np.clip(start + np.where(np.isnan(n), 0, n).astype(np.int64), start, length)
+    return cumulative[..., end] - cumulative[..., start]
+
+
+def shift(values, periods=-1):
+    """ Shifts values along the last axis filling with NaN, like Series.shift.  The default -1 moves each value back one index. """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+    if periods < 0:
+        result[..., :periods] = values[..., -periods:]
+    elif periods > 0:
+        result[..., periods:] = values[..., :-periods]
+    else:
+        result[...] = values
+    return result
+
+
+def discount_factors(rates):
+    """
+    Discount factors v^t from the interest rate for each period, in one cumulative product.
+    The rate at t applies from t to t+1, so v^t is the product of 1 / (1 + i) over the periods before t.
+    Works along the last axis so a (policy x time) array of rates gives a discount factor per policy.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    factors = np.ones(rates.shape)
+    factors[..., 1:] = 1 / np.cumprod(1 + rates[..., :-1], axis=-1)
+    return factors
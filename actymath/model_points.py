@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from actymath.calc import Calc
+from actymath.exceptions import ActyMathError
+from actymath.stream import DEFAULT_COLUMNS, select_flags
+
+""" Valuing policies that share a basis once, as model points. """
+
+BASIS = ["table", "age", "select", "term", "rate"]
+
+
+class ModelPoints:
+    """
+    Groups the policies that share a basis - mortality table, age, select flag,
+    term and interest rate - into model points.
+
+    Each model point is valued once in a Calc cut to its term (see Calc.set_horizon).
+    The values per unit are then scattered back to the policies and multiplied by
+    the amount of each policy, e.g. the sum assured.
+    """
+
+    def __init__(
+        self,
+        policies,
+        table,
+        rate=None,
+        amount_column="sum_assured",
+        age_column="age",
+        term_column="term",
+        rate_column="rate",
+        select_column="select",
+        table_column="table",
+    ):
+        """
+        Params:
+        - policies (DataFrame) - a row per policy
+        - table (MortalityTable, class or dict) - the mortality table, a table class to load,
+          or a dictionary of tables keyed by the values in table_column
+        - rate (float) - fixed interest rate for all policies.  Default is to read it from rate_column.
+        - amount_column (str) - column of the amount each value is multiplied by.  Values are per unit if it is missing.
+        - age_column (str) - column of the age at the start.  Default is "age".
+        - term_column (str) - column of the term in periods.  Default is "term".
+        - rate_column (str) - column of the interest rate, used if rate is not given.  Default is "rate".
+        - select_column (str) - optional column of select flags (see stream.select_flags).  Select mortality is used if it is missing.
+        - table_column (str) - column of the table keys, used if table is a dictionary.  Default is "table".
+        """
+        if isinstance(table, type):
+            table = table()
+        self.tables = table if isinstance(table, dict) else {None: table}
+        self.policies = policies
+
+        size = len(policies)
+        basis = pd.DataFrame(
+            {
+                "table": policies[table_column].to_numpy()
+                if isinstance(table, dict)
+                else np.zeros(size, dtype=np.int64),
+                "age": policies[age_column].to_numpy(dtype=np.int64),
+                "select": select_flags(policies[select_column])
+                if select_column in policies.columns
+                else np.ones(size, dtype=bool),
+                "term": policies[term_column].to_numpy(dtype=np.int64),
+                "rate": policies[rate_column].to_numpy(dtype=np.float64)
+                if rate is None
+                else np.full(size, float(rate)),
+            }
+        )
+        missing = set(basis["table"]) - set(self.tables) if isinstance(table, dict) else set()
+        if missing:
+            raise ActyMathError(f"No mortality table for ({', '.join(map(str, missing))})")
+
+        # Policies with the same basis share a code, the row of their model point
+        self.codes, points = pd.MultiIndex.from_frame(basis).factorize()
+        self.points = pd.DataFrame(list(points), columns=BASIS)
+        if not isinstance(table, dict):
+            self.points["table"] = None
+        self.amounts = (
+            policies[amount_column].to_numpy(dtype=np.float64)
+            if amount_column in policies.columns
+            else np.ones(size)
+        )
+
+    def __len__(self):
+        return len(self.policies)
+
+    @property
+    def compression_ratio(self):
+        """ Number of policies for each model point valued. """
+        return len(self) / max(len(self.points), 1)
+
+    def unit_values(self, columns=DEFAULT_COLUMNS, t=0):
+        """
+        Returns a DataFrame with a row per model point of its basis and the values per unit at time t.
+
+        Params:
+        - columns (list of str) - the Calc column names to value e.g. "a_due(x1)[n1]"
+        - t (int) - time period to report.  Default is 0.
+        """
+        values = np.empty((len(self.points), len(columns)))
+        for row, point in enumerate(self.points.itertuples(index=False)):
+            calc = Calc(horizon=max(point.term, t) + 1)
+            calc.add_life(point.age, table=self.tables[point.table], select=point.select)
+            calc.add_i(rate=point.rate)
+            calc.add_term(n=point.term)
+            calc.populate(columns, keep="outputs")
+            values[row] = calc[columns].iloc[t].to_numpy()
+        return pd.concat(
+            [self.points, pd.DataFrame(values, columns=columns)], axis=1
+        )
+
+    def value(self, columns=DEFAULT_COLUMNS, t=0):
+        """
+        Returns a DataFrame of the values at time t with a row per policy, multiplied by the policy amounts.
+
+        Params:
+        - columns (list of str) - the Calc column names to value e.g. "a_due(x1)[n1]"
+        - t (int) - time period to report.  Default is 0.
+        """
+        values = self.unit_values(columns, t=t)[columns].to_numpy()
+        return pd.DataFrame(
+            values[self.codes] * self.amounts[:, None],
+            index=self.policies.index,
+            columns=columns,
+        )
+
+    def __str__(self):
+        return (
+            f"{len(self)} policies in {len(self.points)} model points, "
+            f"compression ratio {self.compression_ratio:.1f}"
+        )
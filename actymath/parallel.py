@@ -0,0 +1,173 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+from actymath.store import float_dtype
+
+""" Valuing a portfolio across worker processes with the inputs and results in shared memory. """
+
+
+class SharedArray:
+    """
+    A NumPy array published in shared memory.
+
+    The publishing process creates it from an array and must close() it when done.
+    Worker processes attach to it by its spec without copying the data.
+    """
+
+    def __init__(self, values=None, spec=None):
+        if spec is None:
+            values = np.ascontiguousarray(values)
+            self.shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            self.spec = (self.shm.name, values.shape, values.dtype.str)
+            self.owner = True
+        else:
+            self.shm = _attach(spec[0])
+            self.spec = spec
+            self.owner = False
+        self.array = np.ndarray(self.spec[1], dtype=self.spec[2], buffer=self.shm.buf)
+        if spec is None:
+            self.array[...] = values
+
+    def close(self):
+        """ Releases the shared memory, removing it if this process published it. """
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _attach(name):
+    """
+    Attaches to shared memory created by the publishing process, which stays responsible for removing it.
+    Pool workers share the publisher's resource tracker, so registering the name again is harmless.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Shared arrays and tables attached in a worker process by _start_worker
+_worker = {}
+
+
+def _start_worker(table_specs, policy_specs, results_spec, dtype):
+    """ Attaches a worker process to the shared tables, policies and results. """
+    _worker["dtype"] = dtype
+    _worker["tables"] = []
+    for class_, table_dtype, ages_spec, data_spec in table_specs:
+        ages, data = SharedArray(spec=ages_spec), SharedArray(spec=data_spec)
+        _worker["tables"].append(
+            ((ages, data), class_.from_arrays(ages.array, data.array, dtype=table_dtype))
+        )
+    _worker["policies"] = {key: SharedArray(spec=spec) for key, spec in policy_specs.items()}
+    _worker["results"] = SharedArray(spec=results_spec)
+
+
+def _value_chunk(start, end, columns):
+    """ Values policies start:end in a worker, writing the results straight into shared memory. """
+    policies = {key: shared.array[start:end] for key, shared in _worker["policies"].items()}
+    tables = [table for _, table in _worker["tables"]]
+    portfolio = Portfolio(
+        ages=policies["ages"],
+        terms=policies["terms"],
+        rates=policies["rates"],
+        tables=[tables[index] for index in policies["table_ids"]],
+        select=policies["select"],
+        dtype=_worker["dtype"],
+    )
+    results = _worker["results"].array
+    for position, column in enumerate(columns):
+        results[start:end, position] = portfolio[column][:, 0]
+    return end - start
+
+
+def value_portfolio(
+    ages,
+    terms,
+    rates,
+    tables,
+    columns,
+    table_ids=0,
+    select=True,
+    workers=None,
+    chunk_size=None,
+    dtype=np.float64,
+):
+    """
+    Values a portfolio of policies at t=0 across a pool of worker processes.
+
+    The mortality tables and policy data are published once in shared memory and
+    each worker attaches to them without copying.  Workers value chunks of policies
+    with a Portfolio and write the values straight into a shared results array.
+
+    Params:
+    - ages (array of int) - Age of each life at the start
+    - terms (array of int) - Term in periods for each policy
+    - rates (float or array of float) - Fixed interest rate for each policy
+    - tables (MortalityTable or list) - The mortality tables used
+    - columns (list of str) - Portfolio column names to value e.g. "a_due(x1)[n1]"
+    - table_ids (int or array of int) - Index in tables for each policy.  Default is 0.
+    - select (bool or array of bool) - Use select mortality from 2D tables.  Default is True.
+    - workers (int) - Number of worker processes.  Default is the number of CPUs.
+    - chunk_size (int) - Policies valued in each task.  Default splits the work into 4 tasks per worker.
+    - dtype - precision of the Portfolio arrays in the workers, np.float64 or np.float32.  Default is np.float64.
+
+    Returns:
+    - DataFrame with a row per policy and a column for each of the columns requested
+    """
+    if not isinstance(tables, (list, tuple)):
+        tables = [tables]
+    ages = np.asarray(ages, dtype=np.int64)
+    size = ages.shape[0]
+    policies = {
+        "ages": ages,
+        "terms": np.broadcast_to(np.asarray(terms, dtype=np.int64), size),
+        "rates": np.broadcast_to(np.asarray(rates, dtype=np.float64), size),
+        "table_ids": np.broadcast_to(np.asarray(table_ids, dtype=np.int64), size),
+        "select": np.broadcast_to(np.asarray(select, dtype=bool), size),
+    }
+    if size and not 0 <= policies["table_ids"].min() <= policies["table_ids"].max() < len(tables):
+        raise ActyMathError("Table ids must index the list of tables")
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-size // (workers * 4)))
+
+    shared = []
+    try:
+        table_specs = []
+        for table in tables:
+            # Published in their own dtype so the workers load the same table without converting it
+            ages, data = SharedArray(table.ages), SharedArray(table.data)
+            shared += [ages, data]
+            table_specs.append((type(table), np.dtype(table.dtype), ages.spec, data.spec))
+        policy_specs = {}
+        for key, values in policies.items():
+            policy = SharedArray(values)
+            shared.append(policy)
+            policy_specs[key] = policy.spec
+        results = SharedArray(np.full((size, len(columns)), np.nan))
+        shared.append(results)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_start_worker,
+            initargs=(table_specs, policy_specs, results.spec, float_dtype(dtype)),
+        ) as executor:
+            tasks = [
+                executor.submit(_value_chunk, start, min(start + chunk_size, size), columns)
+                for start in range(0, size, chunk_size)
+            ]
+            for task in tasks:
+                task.result()
+
+        return pd.DataFrame(results.array.copy(), columns=columns)
+    finally:
+        for array in shared:
+            array.close()
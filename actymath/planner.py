@@ -0,0 +1,289 @@
+import re
+import time
+from collections import namedtuple
+
+from actymath.exceptions import ActyMathError
+from actymath.store import shrink
+
+""" Planning which columns to calculate and in which order. """
+
+
+# One column to calculate, with the kwargs parsed from its name.
+# Values are set when the column can be fetched without calculating it (e.g. from a cache).
+Step = namedtuple("Step", ["column", "class_", "kwargs", "dependencies", "values"])
+
+
+class Plan:
+    """
+    An ordered list of the columns to calculate for a Calc.
+
+    Every column appears once and after all of its dependencies, so executing
+    the plan calculates each column exactly once.  Columns not kept are released
+    after the last step that depends on them, and dropped in batches (see drops).
+    """
+
+    def __init__(self, calc, columns: list, steps: list, keep="all"):
+        self.calc = calc
+        self.columns = columns  # The columns requested
+        self.steps = steps
+        self.keep = keep
+        self.releases = releases(calc, columns, steps, keep)  # Step index -> columns no longer needed after it
+        self.drops = drops(calc, steps, self.releases)  # Step index -> columns dropped after it
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def cost(self, step: Step):
+        """ Estimated cost of a step - the relative cost of the column multiplied by the rows. """
+        if step.values is not None:
+            return 0
+        return step.class_.cost * len(self.calc.index)
+
+    @property
+    def total_cost(self):
+        return sum(self.cost(step) for step in self.steps)
+
+    def _column_counts(self):
+        """ Yields the number of columns in the Calc after each step, and after the drops that follow it. """
+        existing = set(self.calc.columns)
+        count = len(existing)
+        for index, step in enumerate(self.steps):
+            if step.column not in existing:
+                count += 1
+            yield count
+            if index in self.drops:
+                count -= len(self.drops[index])
+                yield count
+
+    @property
+    def peak_columns(self):
+        """ Most columns in the Calc at once while the plan is executed, after dropping the columns not kept. """
+        return max(self._column_counts(), default=len(self.calc.columns))
+
+    @property
+    def peak_bytes(self):
+        """
+        Estimated peak memory of the Calc columns while the plan is executed.  For a column store
+        this is the buffer allocated, including the spare capacity, in the precision of the columns.
+        """
+        rows = len(self.calc.index)
+        store = self.calc._store if self.calc._store_ready() else None
+        if store is None:
+            return self.peak_columns * rows * self.calc._column_dtype().itemsize
+        capacity = peak = store.capacity
+        count = len(store)
+        for columns in self._column_counts():
+            if columns > count:
+                while columns > capacity:
+                    capacity *= 2
+            else:
+                capacity = shrink(capacity, columns)
+            count = columns
+            peak = max(peak, capacity)
+        return peak * rows * store.dtype.itemsize
+
+    def execute(self):
+        """ Calculates each column of the plan in order, dropping the columns not kept once they are no longer needed. """
+        profiler = getattr(self.calc, "profiler", None)
+        for index, step in enumerate(self.steps):
+            if profiler is not None:
+                allocated = profiler.allocation_start()
+                start = time.perf_counter()
+            if step.values is not None:
+                step.class_.write(self.calc, step.values, **step.kwargs)
+            else:
+                step.class_.insert(self.calc, **step.kwargs)
+            if profiler is not None:
+                profiler.computed(
+                    step.class_,
+                    step.column,
+                    time.perf_counter() - start,
+                    profiler.allocated(allocated),
+                    cached=step.values is not None,
+                )
+                profiler.memory(self.calc._column_bytes())
+            if index in self.drops:
+                self.calc._delete_columns(self.drops[index])
+
+    def explain(self):
+        """ Returns a printable description of the plan and its estimated cost. """
+        lines = [
+            f"Plan for {', '.join(self.columns)}: {len(self.steps)} columns to calculate, estimated cost {self.total_cost}, "
+            f"peak memory {self.peak_bytes} bytes"
+        ]
+        width = max([len(step.column) for step in self.steps], default=0)
+        for count, step in enumerate(self.steps, start=1):
+            source = "cached" if step.values is not None else ", ".join(step.dependencies) or "-"
+            lines.append(
+                f"{count:>4}. {step.column:<{width}}  cost {self.cost(step):>8}  <- {source}"
+            )
+            if count - 1 in self.drops:
+                lines.append(f"{'':>6}drop {', '.join(self.drops[count - 1])}")
+        return "\n".join(lines)
+
+
+def kept(column: str, columns: list, keep):
+    """
+    Checks whether a column calculated by a plan is kept in the Calc.
+
+    Params:
+    - column (str) - the column name
+    - columns (list of str) - the columns requested, which are always kept
+    - keep (str) - "all" to keep every column, "outputs" to keep only the columns requested,
+      or a regular expression for the names of other columns to keep e.g. "D\\(|a_due"
+    """
+    if keep == "all" or column in columns:
+        return True
+    if keep == "outputs":
+        return False
+    return re.search(keep, column) is not None
+
+
+def releases(calc, columns: list, steps: list, keep="all"):
+    """
+    Returns a dictionary of step index to the columns to drop after that step - the columns
+    not kept, after the last step that depends on them.  Columns already in the Calc are never dropped.
+    """
+    if keep == "all":
+        return {}
+    last = {}
+    for index, step in enumerate(steps):
+        last[step.column] = index
+        for dependency in step.dependencies:
+            last[dependency] = index
+    result = {}
+    for step in steps:
+        if step.column not in calc.columns and not kept(step.column, columns, keep):
+            result.setdefault(last[step.column], []).append(step.column)
+    return result
+
+
+def drops(calc, steps: list, released: dict):
+    """
+    Returns a dictionary of step index to the columns to drop after that step, from the columns released.
+
+    Dropping copies the columns left to a new buffer, so released columns wait until there are
+    at least half as many as the columns in the Calc.  The rest are dropped after the last step.
+    This keeps the copying in proportion to the columns calculated.
+    """
+    existing = set(calc.columns)
+    count = len(existing)
+    pending = []
+    result = {}
+    for index, step in enumerate(steps):
+        if step.column not in existing:
+            count += 1
+        pending += released.get(index, [])
+        if pending and (2 * len(pending) >= count or index == len(steps) - 1):
+            result[index] = pending
+            count -= len(pending)
+            pending = []
+    return result
+
+
+def build_plan(calc, columns: list, force=False, keep="all"):
+    """
+    Expands the requested columns and their dependencies into a Plan.
+
+    Columns already in the Calc are not recalculated unless force is True.
+    Columns available from a cache are fetched without planning their dependencies.
+    Input columns (like q(x) or n) are never recalculated and must already exist.
+
+    Params:
+    - calc (Calc) - the Calc to plan for
+    - columns (list of str) - the names of the columns required
+    - force (bool) - recalculate columns even if they already exist.  Default is False.
+    - keep (str) - the columns calculated to keep: "all", "outputs" for only the columns requested,
+      or a regular expression for other columns to keep as well.  Default is "all".
+    """
+    steps = []
+    planned = set()
+    visiting = set()
+    profiler = getattr(calc, "profiler", None)
+    if profiler is not None:
+        started = time.perf_counter()
+
+    def visit(column):
+        if column in planned:
+            return
+        if profiler is not None:
+            start = time.perf_counter()
+        result = calc.resolver.resolve(column)
+        if result is None:
+            raise ActyMathError(
+                f"Unable to populate column ({column}) - does the class for this column exist?"
+            )
+        class_, kwargs = result
+        if profiler is not None:
+            profiler.resolved(class_, column, time.perf_counter() - start)
+
+        if column in calc.columns and (force is False or class_.input):
+            planned.add(column)
+            if profiler is not None:
+                profiler.skipped(class_, column)
+            return
+
+        for param in class_.parameters.keys():
+            if param not in kwargs:
+                raise ActyMathError(
+                    f"Missing parameter ({param}) to populate ({class_}) - {class_.parameters[param]}."
+                )
+        if class_.input:
+            raise ActyMathError(
+                f"Unable to populate column ({column}) - it is an input and must be added to the Calc first."
+            )
+
+        if force is False:
+            values = class_.lookup(calc, **kwargs)
+            if values is not None:
+                planned.add(column)
+                steps.append(Step(column, class_, kwargs, [], values))
+                return
+
+        if column in visiting:
+            raise ActyMathError(f"Circular dependency found for column ({column})")
+        visiting.add(column)
+        dependencies = [name.format(**kwargs) for name in class_.dependencies]
+        for dependency in dependencies:
+            visit(dependency)
+        visiting.discard(column)
+
+        planned.add(column)
+        steps.append(Step(column, class_, kwargs, dependencies, None))
+
+    for column in columns:
+        visit(column)
+
+    if profiler is not None:
+        profiler.planned(time.perf_counter() - started)
+    return Plan(calc, list(columns), steps, keep=keep)
+
+
+def ancestors(resolver, column: str, memo=None):
+    """
+    Returns the set of all column names this column is derived from, directly or indirectly.
+
+    Params:
+    - resolver (ColumnResolver) - to look up the Column class for each name
+    - column (str) - the column name
+    - memo (dict) - optional dictionary to share results between calls
+    """
+    if memo is None:
+        memo = {}
+    if column in memo:
+        return memo[column]
+    memo[column] = set()  # Guards against circular dependencies
+    result = resolver.resolve(column)
+    if result is None:
+        return memo[column]
+    class_, kwargs = result
+    found = set()
+    for name in class_.dependencies:
+        dependency = name.format(**kwargs)
+        found.add(dependency)
+        found |= ancestors(resolver, dependency, memo)
+    memo[column] = found
+    return found
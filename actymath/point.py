@@ -0,0 +1,85 @@
+import numpy as np
+
+from actymath.kernels import discount_factors
+from actymath.columns.mortality import l_x
+from actymath.exceptions import ActyMathError
+
+""" Values at t=0 only, as scalars, for quick quotes. """
+
+FACTORS = ["a_due", "a", "A", "E", "EA", "NP", "Ia_due", "Ia", "IA", "IE", "IEA"]
+
+
+def point_values(qx, n: int, rate, base: float = l_x.base, factors=None):
+    """
+    Returns the term factors at t=0 for a single life, matching the t=0 values of the
+    term columns in a Calc.
+
+    Only sums of the discounted survivors are needed, so the N, M, R and S columns are
+    never built.  The increasing factors also need the sums of D and C after the term,
+    as the term columns include them.
+
+    Params:
+    - qx (list) - q(x) values for the life starting at the age at t=0
+    - n (int) - term in periods
+    - rate (float or list) - interest rate per period, fixed or a rate for each period from t=0
+    - base (float) - starting value of l(x).  Default is 34481.408.
+    - factors (list of str) - the factors to return.  Default is all of FACTORS.
+
+    Returns:
+    - Dictionary of factor name to value e.g. {"a_due": 8.317, ...}
+    """
+    q = np.asarray(qx, dtype=np.float64)
+    length = len(q)
+    if not 1 <= n < length:
+        raise ActyMathError(f"Term ({n}) must be from 1 to the length of q(x) less one ({length - 1})")
+
+    survival = np.empty(length)
+    survival[0] = base
+    survival[1:] = 1 - q[:-1]
+    l = np.cumprod(survival)
+    if np.ndim(rate) == 0:
+        rates = np.full(length, float(rate))
+    else:
+        rates = np.asarray(rate, dtype=np.float64)[:length]
+        rates = np.concatenate([rates, np.full(length - len(rates), rates[-1])])
+    v = discount_factors(rates)
+    D = v * l
+    C = v[1:] * l[:-1] * q[:-1]  # Deaths as l(x).q(x), the same as the d(x) column
+
+    weights = np.arange(1, n + 1)
+    D0 = D[0]
+    N_n = D[n:].sum()  # N(x+n) - the only tails needed
+    M_n = C[n:].sum()  # M(x+n)
+
+    values = {}
+    values["a_due"] = D[:n].sum() / D0
+    values["a"] = D[1 : n + 1].sum() / D0
+    values["A"] = C[:n].sum() / D0
+    values["E"] = D[n] / D0
+    values["EA"] = values["A"] + values["E"]
+    values["NP"] = values["EA"] / values["a_due"]
+    values["Ia_due"] = (weights @ D[:n] + n * N_n) / D0
+    values["Ia"] = (weights @ D[1 : n + 1] + n * (N_n - D[n])) / D0
+    values["IA"] = (weights @ C[:n] + n * M_n) / D0
+    values["IE"] = n * values["E"]
+    values["IEA"] = values["IE"] + values["IA"]
+
+    if factors is None:
+        return values
+    return {factor: values[factor] for factor in factors}
+
+
+def quote(table, age: int, n: int, rate, select=True, base: float = l_x.base, factors=None):
+    """
+    Returns the term factors at t=0 for a life from a mortality table.
+
+    Params:
+    - table (MortalityTable) - the mortality table
+    - age (int) - age of the life at t=0
+    - n (int) - term in periods
+    - rate (float or list) - interest rate per period, fixed or a rate for each period from t=0
+    - select (bool) - use select mortality.  Default is True.
+    - base (float) - starting value of l(x).  Default is 34481.408.
+    - factors (list of str) - the factors to return.  Default is all of FACTORS.
+    """
+    return point_values(table.qx(age, select=select), n, rate, base=base, factors=factors)
@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from actymath.exceptions import ActyMathError
+from actymath.kernels import discount_factors, shift, tail_sum
+from actymath.store import float_dtype
+
+""" Vectorised valuation of many single life policies at once. """
+
+
+def _take(values, index):
+    """ Fetches one value per policy at the given time index (NaN when out of range). """
+    index = np.asarray(index)
+    inside = (index >= 0) & (index < values.shape[-1])
+    result = np.full(values.shape[:-1], np.nan)
+    rows = np.arange(values.shape[-2])[inside]
+    result[..., inside] = values[..., rows, index[inside]]
+    return result
+
+
+class Portfolio:
+    """
+    Values a portfolio of single life, single term policies in one pass.
+
+    Every quantity is a 2-D NumPy array with one row per policy and one
+    column per time period.  Quantities are fetched using the same column names
+    as a Calc holding one life and one term, e.g. portfolio["A(x1)[n1]"], and
+    match the Calc values for each policy.
+
+    Policies with shorter mortality vectors are padded with NaN beyond their
+    own projection length.
+
+    The arrays are kept as float64, or float32 to halve their memory.  The formulae
+    calculate in float64 and the result is stored in the precision of the Portfolio.
+    """
+
+    def __init__(
+        self,
+        ages,
+        terms,
+        rates,
+        tables=None,
+        qx=None,
+        select=True,
+        base=34481.408,
+        dtype=np.float64,
+    ):
+        """
+        Params:
+        - ages (array of int) - Age of each life at the start
+        - terms (array of int) - Term in periods for each policy
+        - rates (float or array of float) - Fixed interest rate for each policy, or a (policy x period)
+          array of the rate for each period.  Rows shorter than the projection continue at the last rate.
+        - tables (MortalityTable or list) - One table for all policies or a table per policy
+        - qx (list of lists) - Alternative to tables, the q(x) values for each policy
+        - select (bool or array of bool) - Use select mortality from 2D tables.  Default is True.
+        - base (float) - Starting l(x) value.  Default is 34481.408.
+        - dtype - precision of the arrays, np.float64 or np.float32.  Default is np.float64.
+        """
+        self.dtype = float_dtype(dtype)
+        self.ages = np.asarray(ages, dtype=np.int64)
+        size = self.ages.shape[0]
+        self.terms = np.broadcast_to(np.asarray(terms, dtype=np.int64), size)
+        self.rates = np.asarray(rates, dtype=np.float64)
+        if self.rates.ndim < 2:
+            self.rates = np.broadcast_to(self.rates, size)
+        elif self.rates.shape[0] != size or self.rates.shape[1] == 0:
+            raise ActyMathError(
+                f"Interest rates ({self.rates.shape}) must have a row of rates for each policy ({size})"
+            )
+        self.base = base
+
+        if (tables is None) == (qx is None):
+            raise ActyMathError("Specify either tables or qx for the Portfolio")
+        if qx is None:
+            qx = self._fetch_qx(tables, np.broadcast_to(select, size))
+        if len(qx) != size:
+            raise ActyMathError(
+                f"Number of q(x) vectors ({len(qx)}) does not match number of policies ({size})"
+            )
+
+        self.lengths = np.array([len(values) for values in qx], dtype=np.int64)
+        self.t = np.arange(self.lengths.max() if size else 0)
+        self.valid = self.t[None, :] < self.lengths[:, None]
+        self.in_term = self.valid & (self.t[None, :] <= self.terms[:, None])
+
+        q = np.full(self.valid.shape, np.nan, dtype=self.dtype)
+        for row, values in enumerate(qx):
+            q[row, : self.lengths[row]] = values
+        self._arrays = {"q(x1)": q}
+
+    def _fetch_qx(self, tables, select):
+        """ Reads q(x) for each policy, only reading each (table, age, select) once. """
+        if not isinstance(tables, (list, tuple, np.ndarray)):
+            tables = [tables] * self.ages.shape[0]
+        fetched = {}
+        qx = []
+        for table, age, sel in zip(tables, self.ages, select):
+            key = (id(table), int(age), bool(sel))
+            if key not in fetched:
+                fetched[key] = table.qx(int(age), select=bool(sel))
+            qx.append(fetched[key])
+        return qx
+
+    def __len__(self):
+        return self.ages.shape[0]
+
+    @property
+    def columns(self):
+        """ Returns the column names that can be fetched from the Portfolio. """
+        return ["q(x1)"] + list(_formulae.keys())
+
+    def __getitem__(self, column):
+        """ Returns the (policy x time) array for the column, calculating it on first use. """
+        if column not in self._arrays:
+            if column not in _formulae:
+                raise ActyMathError(
+                    f"Unable to calculate column ({column}) - not available in a Portfolio"
+                )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = _formulae[column](self)
+            self._arrays[column] = np.where(self.valid, values, np.nan).astype(
+                self.dtype, copy=False
+            )
+        return self._arrays[column]
+
+    def value(self, columns, t=0):
+        """
+        Returns a DataFrame of the values at time t with a row per policy.
+
+        Params:
+        - columns (list of str) - the column names to fetch
+        - t (int) - time period to report.  Default is 0.
+        """
+        return pd.DataFrame({column: self[column][:, t] for column in columns})
+
+
+def _l(p):
+    """ Survivors from the base, multiplying in the same order as the l(x) column. """
+    q = p["q(x1)"]
+    factors = np.empty((q.shape[0], q.shape[1] + 1))
+    factors[:, 0] = p.base
+    factors[:, 1:] = 1 - q
+    return np.cumprod(factors, axis=1)[:, :-1]
+
+
+def _at_term(p, column, offset=0):
+    """ Value of a column at the end of each policy's term, as a column vector. """
+    return _take(_sums(p, column), p.terms + offset)[..., None]
+
+
+# Sums to the end and the column each sums
+_summed = {"M(x1)": "C(x1)", "N(x1)": "D(x1)", "R(x1)": "M(x1)", "S(x1)": "N(x1)"}
+
+
+def _sums(p, column):
+    """
+    Returns the column for a term formula.  Sums to the end are summed again in float64
+    when the arrays are float32, so differences such as M(x) - M(x+n) are taken before rounding.
+    """
+    if column in _summed and p.dtype != np.float64:
+        return tail_sum(p[_summed[column]])
+    return p[column]
+
+
+def _term(p, values):
+    """ Term formulae stop at the end of the term and missing values default to zero. """
+    return np.where(p.in_term & ~np.isnan(values), values, 0.0)
+
+
+def _i(p):
+    if p.rates.ndim == 1:
+        return np.broadcast_to(p.rates[:, None], p.valid.shape)
+    extra = max(len(p.t) - p.rates.shape[1], 0)
+    return np.concatenate([p.rates, np.repeat(p.rates[:, -1:], extra, axis=1)], axis=1)[
+        :, : len(p.t)
+    ]
+
+
+def _NP(p):
+    values = p["EA(x1)[n1]"] / p["a_due(x1)[n1]"]
+    return _term(p, np.where(np.isinf(values), np.nan, values))
+
+
+_formulae = {
+    # Inputs and mortality
+    "x1": lambda p: (p.ages[:, None] + p.t[None, :]).astype(np.float64),
+    "t": lambda p: np.broadcast_to(p.t, p.valid.shape).astype(np.float64),
+    "n1": lambda p: np.where(
+        p.in_term, (p.terms[:, None] - p.t[None, :]).astype(np.float64), np.nan
+    ),
+    "i": _i,
+    "p(x1)": lambda p: 1 - p["q(x1)"],
+    "l(x1)": _l,
+    "d(x1)": lambda p: np.where(
+        np.isnan(shift(p["l(x1)"])), np.nan, p["l(x1)"] * p["q(x1)"].astype(np.float64)
+    ),
+    # Interest and commutation
+    "v^t": lambda p: discount_factors(p["i"]),
+    "C(x1)": lambda p: shift(p["v^t"]) * p["d(x1)"],
+    "D(x1)": lambda p: p["v^t"] * p["l(x1)"],
+    "M(x1)": lambda p: tail_sum(p["C(x1)"]),
+    "N(x1)": lambda p: tail_sum(p["D(x1)"]),
+    "R(x1)": lambda p: tail_sum(p["M(x1)"]),
+    "S(x1)": lambda p: tail_sum(p["N(x1)"]),
+    # Term limited formulae
+    "a_due(x1)[n1]": lambda p: _term(
+        p, (_sums(p, "N(x1)") - _at_term(p, "N(x1)")) / p["D(x1)"]
+    ),
+    "a(x1)[n1]": lambda p: _term(
+        p, (shift(_sums(p, "N(x1)")) - _at_term(p, "N(x1)", 1)) / p["D(x1)"]
+    ),
+    "A(x1)[n1]": lambda p: _term(
+        p, (_sums(p, "M(x1)") - _at_term(p, "M(x1)")) / p["D(x1)"]
+    ),
+    "E(x1)[n1]": lambda p: _term(p, _at_term(p, "D(x1)") / p["D(x1)"]),
+    "EA(x1)[n1]": lambda p: _term(
+        p,
+        (_sums(p, "M(x1)") - _at_term(p, "M(x1)") + _at_term(p, "D(x1)")) / p["D(x1)"],
+    ),
+    "NP(x1)[n1]": _NP,
+    "Ia_due(x1)[n1]": lambda p: _term(
+        p, (_sums(p, "S(x1)") - _at_term(p, "S(x1)")) / p["D(x1)"]
+    ),
+    "Ia(x1)[n1]": lambda p: _term(
+        p, (shift(_sums(p, "S(x1)")) - _at_term(p, "S(x1)", 1)) / p["D(x1)"]
+    ),
+    "IA(x1)[n1]": lambda p: _term(
+        p, (_sums(p, "R(x1)") - _at_term(p, "R(x1)")) / p["D(x1)"]
+    ),
+    "IE(x1)[n1]": lambda p: _term(
+        p, _at_term(p, "D(x1)") * p.terms[:, None] / p["D(x1)"]
+    ),
+    "IEA(x1)[n1]": lambda p: _term(p, p["IE(x1)[n1]"] + p["IA(x1)[n1]"]),
+}
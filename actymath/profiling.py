@@ -0,0 +1,100 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+""" Opt-in timing and counts for the columns populated in a Calc. """
+
+FIELDS = ["computed", "cached", "skipped", "seconds", "resolve_seconds", "bytes"]
+
+
+class Profile:
+    """
+    Records, for each column class and column name, how often the column was calculated,
+    fetched from a cache or skipped because it already existed, the time spent calculating
+    and resolving it and the bytes allocated while calculating it.
+
+    The bytes are the most memory allocated at once during each calculation, above what was
+    allocated before it, including temporary arrays and any growth of the column store.
+    They are measured with tracemalloc, which is switched on while profiling and slows the
+    calculations down.
+
+    Created by Calc.profile() - nothing is recorded when a Calc is not being profiled.
+    """
+
+    def __init__(self):
+        self.records = {}  # (class name, column name) -> dictionary of FIELDS
+        self.plans = 0
+        self.plan_seconds = 0.0
+        self.peak_bytes = 0  # Most bytes of columns in the Calc at once
+        self.started = time.perf_counter()
+        self.seconds = None  # Total time profiled, set when profiling ends
+        self._tracing = not tracemalloc.is_tracing()  # Stop tracing at the end if started here
+        if self._tracing:
+            tracemalloc.start()
+
+    def _record(self, class_, column):
+        key = (class_.__name__, column)
+        if key not in self.records:
+            self.records[key] = dict.fromkeys(FIELDS, 0)
+        return self.records[key]
+
+    def planned(self, seconds):
+        self.plans += 1
+        self.plan_seconds += seconds
+
+    def resolved(self, class_, column, seconds):
+        self._record(class_, column)["resolve_seconds"] += seconds
+
+    def skipped(self, class_, column):
+        self._record(class_, column)["skipped"] += 1
+
+    def computed(self, class_, column, seconds, nbytes, cached=False):
+        record = self._record(class_, column)
+        record["cached" if cached else "computed"] += 1
+        record["seconds"] += seconds
+        record["bytes"] += nbytes
+
+    def memory(self, nbytes):
+        self.peak_bytes = max(self.peak_bytes, nbytes)
+
+    def allocation_start(self):
+        """ Starts measuring the memory allocated by a calculation.  Returns the bytes allocated now. """
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def allocated(self, start: int):
+        """ Returns the most bytes allocated above start since allocation_start. """
+        return max(tracemalloc.get_traced_memory()[1] - start, 0)
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self.started
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def to_frame(self, by="column"):
+        """
+        Returns the profile as a DataFrame, slowest first.
+
+        Params:
+        - by (str) - "column" for a row per column name or "class" for a row per column class.  Default is "column".
+        """
+        frame = pd.DataFrame(
+            [
+                {"class": class_name, "column": column, **record}
+                for (class_name, column), record in self.records.items()
+            ],
+            columns=["class", "column"] + FIELDS,
+        )
+        if by == "class":
+            frame = frame.drop(columns="column").groupby("class", as_index=False).sum()
+        return frame.sort_values("seconds", ascending=False, ignore_index=True)
+
+    def __str__(self):
+        total = f"{self.seconds:.4f}s" if self.seconds is not None else "running"
+        return (
+            f"Profile: {total} in total, {self.plan_seconds:.4f}s planning {self.plans} plans, "
+            f"peak {self.peak_bytes} bytes of columns\n"
+            + self.to_frame().to_string(index=False)
+        )
@@ -0,0 +1,62 @@
+import parse
+
+""" Resolving column names to the Column classes that calculate them. """
+
+
+class ColumnResolver:
+    """
+    Resolves a column name (e.g. "A(x1)[n1]") to its Column class and kwargs.
+
+    The column_name templates in the register are compiled once and grouped by
+    their literal prefix, so only templates that could match are tried.  They are
+    tried in register order, so the more specific columns listed first in
+    columns/__init__.py still win.  Resolved names are remembered so repeat
+    lookups are a single dictionary fetch.
+    """
+
+    def __init__(self, register: dict):
+        self.register = register
+        self._templates = []  # (literal prefix, compiled parser, class) in register order
+        for column_name, class_ in register.items():
+            prefix = column_name.split("{", 1)[0]
+            parser = parse.compile(column_name, case_sensitive=True)
+            self._templates.append((prefix, parser, class_))
+        self._candidates = {}  # First character -> templates that could match
+        self._resolved = {}  # Memo of column name -> (class, kwargs)
+
+    def _templates_for(self, column: str):
+        """ Returns the templates whose literal prefix could match the column name. """
+        key = column[:1]
+        if key not in self._candidates:
+            self._candidates[key] = [
+                (prefix, parser, class_)
+                for prefix, parser, class_ in self._templates
+                if prefix[:1] in ("", key)
+            ]
+        return self._candidates[key]
+
+    def resolve(self, column: str):
+        """
+        Returns a tuple (Column class, dict of kwargs) for the column name.
+        Returns None if no registered column matches.
+        """
+        try:
+            class_, kwargs = self._resolved[column]
+        except KeyError:
+            result = self._resolve(column)
+            if result is None:
+                return None
+            self._resolved[column] = result
+            class_, kwargs = result
+        return class_, dict(kwargs)
+
+    def _resolve(self, column: str):
+        if column in self.register:  # Template name or a column without kwargs
+            return self.register[column], {}
+        for prefix, parser, class_ in self._templates_for(column):
+            if not column.startswith(prefix):
+                continue
+            result = parser.parse(column)
+            if result is not None:
+                return class_, result.named
+        return None
@@ -0,0 +1,99 @@
+import numpy as np
+
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+
+""" Valuing a portfolio under many interest rate scenarios at once. """
+
+# Columns that do not depend on interest - calculated once by the Portfolio and shared by every scenario
+MORTALITY_COLUMNS = ["x1", "t", "n1", "q(x1)", "p(x1)", "l(x1)", "d(x1)"]
+
+# Upper estimate of the (policy x time) arrays held for each scenario while valuing a chunk,
+# covering every interest dependent column plus temporaries
+ARRAYS_PER_SCENARIO = 24
+
+
+class _Scenarios(Portfolio):
+    """
+    A chunk of scenarios for a Portfolio.  Interest dependent columns are
+    (scenario x policy x time) arrays and mortality columns are the Portfolio's
+    own (policy x time) arrays, broadcast across the scenarios.
+    """
+
+    def __init__(self, portfolio, rates):
+        self.ages = portfolio.ages
+        self.terms = portfolio.terms
+        self.base = portfolio.base
+        self.dtype = portfolio.dtype
+        self.lengths = portfolio.lengths
+        self.t = portfolio.t
+        self.valid = portfolio.valid
+        self.in_term = portfolio.in_term
+        self.rates = rates
+        self._arrays = {column: portfolio[column] for column in MORTALITY_COLUMNS}
+        self._arrays["i"] = rates[:, None, :]
+
+
+class ScenarioCube:
+    """
+    Values a Portfolio under a (scenario x time) array of interest rates.
+
+    Mortality columns (q, p, l and d) are calculated once for the Portfolio.
+    Only the interest dependent columns (v^t, C, D, M, N, ...) are calculated for
+    each scenario, as (scenario x policy x time) arrays.  Scenarios are valued in
+    chunks so the working arrays stay within max_bytes.
+    """
+
+    def __init__(self, portfolio, rates, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Params:
+        - portfolio (Portfolio) - the policies to value.  Its own interest rates are not used.
+        - rates (array of float) - (scenario x time) array of the interest rate for each period
+          (from t to t+1).  Rows shorter than the projection continue at the last rate.
+        - max_bytes (int) - memory budget for the working arrays of a chunk of scenarios.  Default is 256MiB.
+        """
+        rates = np.asarray(rates, dtype=np.float64)
+        if rates.ndim != 2 or rates.shape[1] == 0:
+            raise ActyMathError(
+                f"Scenario interest rates ({rates.shape}) must be a (scenario x time) array"
+            )
+        periods = len(portfolio.t)
+        extra = max(periods - rates.shape[1], 0)
+        self.rates = np.concatenate(
+            [rates, np.repeat(rates[:, -1:], extra, axis=1)], axis=1
+        )[:, :periods]
+        self.portfolio = portfolio
+        self.max_bytes = max_bytes
+
+    def __len__(self):
+        return self.rates.shape[0]
+
+    @property
+    def chunk_size(self):
+        """ Number of scenarios valued together within the memory budget (at least one). """
+        scenario_bytes = (
+            self.portfolio.valid.size * self.portfolio.dtype.itemsize * ARRAYS_PER_SCENARIO
+        )
+        return max(1, self.max_bytes // max(scenario_bytes, 1))
+
+    def chunks(self):
+        """ Yields (start, end, chunk) for each chunk of scenarios, where chunk[column] is a (scenario x policy x time) array. """
+        for start in range(0, len(self), self.chunk_size):
+            end = min(start + self.chunk_size, len(self))
+            yield start, end, _Scenarios(self.portfolio, self.rates[start:end])
+
+    def value(self, columns, t=0):
+        """
+        Returns a (scenario x policy x column) array of the values at time t.
+
+        Params:
+        - columns (list of str) - the Portfolio column names to value e.g. "a_due(x1)[n1]"
+        - t (int) - time period to report.  Default is 0.
+        """
+        result = np.empty((len(self), len(self.portfolio), len(columns)))
+        for start, end, chunk in self.chunks():
+            for position, column in enumerate(columns):
+                result[start:end, :, position] = np.broadcast_to(
+                    chunk[column], (end - start,) + self.portfolio.valid.shape
+                )[..., t]
+        return result
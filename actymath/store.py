@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from actymath.exceptions import ActyMathError
+
+""" Preallocated float storage for the columns of a Calc. """
+
+# Precisions the columns can be stored in
+FLOAT_DTYPES = (np.dtype(np.float64), np.dtype(np.float32))
+
+
+def float_dtype(dtype):
+    """ Returns the numpy dtype, checking it is one of FLOAT_DTYPES. """
+    dtype = np.dtype(dtype)
+    if dtype not in FLOAT_DTYPES:
+        raise ActyMathError(f"Columns can only be stored as float64 or float32, not ({dtype})")
+    return dtype
+
+
+def shrink(capacity: int, count: int):
+    """ Returns the capacity after deleting down to count columns - halved while no more than half is used. """
+    while capacity > 4 and count <= capacity // 2:
+        capacity //= 2
+    return capacity
+
+
+class ColumnStore:
+    """
+    A growable 2-D float64 (or float32) buffer holding the columns of a Calc, one row of the
+    buffer per column so each column is contiguous.
+
+    Columns are written straight into their slot.  Room for more columns is
+    preallocated and the capacity doubles when it runs out, so adding a column
+    rarely allocates.  The frame() is a single pandas block viewing the buffer.
+
+    Slots already written are never written again in the same buffer, as Series read
+    from the frame view them.  Replacing a column moves the columns to a new buffer.
+    """
+
+    def __init__(self, rows: int, capacity: int = 32, dtype=np.float64):
+        self.rows = rows
+        self.dtype = float_dtype(dtype)
+        self.names = []
+        self.slots = {}  # Column name -> row of the buffer
+        self.buffer = np.empty((capacity, rows), dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.slots
+
+    @property
+    def capacity(self):
+        return self.buffer.shape[0]
+
+    @property
+    def nbytes(self):
+        """ Bytes allocated for the buffer, including the spare capacity. """
+        return self.buffer.nbytes
+
+    def set(self, name, values, scale=None):
+        """
+        Writes the values (a scalar or one value per row) into the slot for the column, adding it if new.
+        The values are multiplied by scale as they are written if it is given.
+        """
+        slot = self.slots.get(name)
+        if slot is not None:
+            # Series read before keep the old values in the old buffer
+            self._reallocate(self.capacity)
+        else:
+            if len(self.names) == self.capacity:
+                self._reallocate(self.capacity * 2)
+            slot = len(self.names)
+            self.slots[name] = slot
+            self.names.append(name)
+        if scale is None:
+            self.buffer[slot] = values
+        else:
+            np.multiply(values, scale, out=self.buffer[slot])
+
+    def delete(self, names):
+        """
+        Removes the columns.  The others are copied to a new buffer so that Series
+        already read from the Calc keep their values.  The new buffer shrinks (see shrink)
+        so the memory is freed.
+        """
+        names = set(names)
+        keep = [name for name in self.names if name not in names]
+        buffer = np.empty((shrink(self.capacity, len(keep)), self.rows), dtype=self.dtype)
+        for slot, name in enumerate(keep):
+            buffer[slot] = self.buffer[self.slots[name]]
+        self.buffer = buffer
+        self.names = keep
+        self.slots = {name: slot for slot, name in enumerate(keep)}
+
+    def _reallocate(self, capacity: int):
+        """ Moves the columns to a new buffer with room for capacity columns. """
+        buffer = np.empty((capacity, self.rows), dtype=self.dtype)
+        buffer[: len(self.names)] = self.buffer[: len(self.names)]
+        self.buffer = buffer
+
+    def truncate(self, rows: int):
+        """ Keeps only the first rows of every column, in a new buffer. """
+        self.buffer = self.buffer[:, :rows].copy()
+        self.rows = self.buffer.shape[1]
+
+    def frame(self, index):
+        """ Returns a DataFrame of the columns viewing the buffer without copying. """
+        return pd.DataFrame(
+            self.buffer[: len(self.names)].T,
+            index=index,
+            columns=pd.Index(self.names, dtype=object),
+            copy=False,
+        )
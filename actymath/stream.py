@@ -0,0 +1,101 @@
+import pandas as pd
+
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+
+""" Valuing policy files in fixed size chunks, so memory does not grow with the file size. """
+
+DEFAULT_COLUMNS = ["a_due(x1)[n1]", "A(x1)[n1]", "EA(x1)[n1]", "NP(x1)[n1]"]
+
+# Values of a select flag in a policy file
+SELECT_FLAGS = {"Y": True, "True": True, "1": True, "N": False, "False": False, "0": False}
+
+
+def select_flags(values):
+    """
+    Returns a boolean array of the select flags in a policy file column.
+    Y, True and 1 are select and N, False and 0 are ultimate.  Anything else raises an ActyMathError.
+
+    Params:
+    - values (Series or array) - the select flags as read from the file
+    """
+    values = pd.Series(values)
+    if values.dtype == bool:
+        return values.to_numpy()
+    flags = values.astype(str).str.strip().map(SELECT_FLAGS)
+    unknown = flags.isna()
+    if unknown.any():
+        raise ActyMathError(
+            f"Unknown select flags ({', '.join(sorted(set(values[unknown].astype(str))))}) "
+            f"- use one of {', '.join(SELECT_FLAGS)}"
+        )
+    return flags.to_numpy(dtype=bool)
+
+
+def value_policies(
+    path,
+    table,
+    rate=None,
+    columns=DEFAULT_COLUMNS,
+    chunk_size=10000,
+    age_column="age",
+    term_column="term",
+    rate_column="rate",
+    select_column="select",
+):
+    """
+    Reads a CSV policy file in chunks and yields the values at t=0 for each chunk.
+
+    Only one chunk of policies is held in memory at a time, so peak memory
+    depends on the chunk size and not on the size of the file.
+
+    Params:
+    - path (str or file) - CSV file with a row per policy
+    - table (MortalityTable or class) - the mortality table, or a table class to load
+    - rate (float) - fixed interest rate for all policies.  Default is to read it from rate_column.
+    - columns (list of str) - Portfolio column names to value.  Default is DEFAULT_COLUMNS.
+    - chunk_size (int) - number of policies read and valued at a time.  Default is 10000.
+    - age_column (str) - column of the age at the start.  Default is "age".
+    - term_column (str) - column of the term in periods.  Default is "term".
+    - rate_column (str) - column of the interest rate, used if rate is not given.  Default is "rate".
+    - select_column (str) - optional column of select flags (see select_flags).  Select mortality is used if it is missing.
+
+    Yields:
+    - DataFrame for each chunk with the policy file columns and a column for each value
+    """
+    if isinstance(table, type):
+        table = table()
+
+    for chunk in pd.read_csv(path, chunksize=chunk_size):
+        portfolio = Portfolio(
+            ages=chunk[age_column].to_numpy(),
+            terms=chunk[term_column].to_numpy(),
+            rates=chunk[rate_column].to_numpy() if rate is None else rate,
+            tables=table,
+            select=select_flags(chunk[select_column])
+            if select_column in chunk.columns
+            else True,
+        )
+        values = portfolio.value(columns)
+        values.index = chunk.index
+        yield pd.concat([chunk, values], axis=1)
+
+
+def value_policy_file(path, output, table, **kwargs):
+    """
+    Values a CSV policy file in chunks and writes the results to a CSV file as each chunk is valued.
+
+    Params:
+    - path (str or file) - CSV file with a row per policy
+    - output (str or file) - CSV file to write with the policy columns and values
+    - table (MortalityTable or class) - the mortality table, or a table class to load
+    - kwargs - any other parameters of value_policies
+
+    Returns:
+    - Number of policies valued
+    """
+    count = 0
+    for chunk in value_policies(path, table, **kwargs):
+        chunk.to_csv(output, mode="w" if count == 0 else "a", header=count == 0, index=False)
+        count += len(chunk)
+    return count
@@ -1,34 +1,197 @@
 import csv
+import hashlib
+import json
 import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
 
 from actymath.exceptions import MortalityTableError
+from actymath.kernels import discount_factors, shift, tail_sum
+from actymath.store import FLOAT_DTYPES
 
 DATA_PATH = os.path.dirname(__file__) + "/table_data"
 
+# Where compiled binary copies of CSV tables are kept, unless ACTYMATH_CACHE_DIR is set
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "actymath")
+
+
+def convert_lx_to_qx(lx_list):
+    """ Converts a list or array of lx values to an array of qx values. """
+    lx = np.asarray(lx_list, dtype=np.float64)
+    return 1 - lx[1:] / lx[:-1]
+
+
+def read_only(values):
+    """ Marks a NumPy array as read only and returns it. """
+    values.flags.writeable = False
+    return values
 
-def convert_lx_to_qx(lx_list: list):
-    """ Converts a list of lx values to a qx list. """
-    q_values = []
-    for i, l in enumerate(lx_list[:-1]):
-        q_values.append(1 - lx_list[i + 1] / l)
-    return q_values
 
+class CommutationTable:
+    """
+    Commutation columns D, N, C, M, R and S for every age in a mortality table
+    at a fixed interest rate, using ultimate mortality.
+
+    The columns run from the first age in the table.  The columns for a life of
+    any age are read as views starting at that age, scaled by a single factor
+    to the life's own l(x) base.  They use the same kernels as the Calc columns.
+    """
 
+    symbols = ["C", "D", "M", "N", "R", "S"]
+
+    def __init__(self, qx: list, rate: float):
+        """
+        Params:
+        - qx (list) - ultimate q(x) values for all ages in the table
+        - rate (float) - the interest rate per period
+        """
+        q = np.asarray(qx, dtype=np.float64)
+        self.rate = rate
+        factors = np.empty(len(q))
+        factors[:1] = 1.0
+        factors[1:] = 1 - q[:-1]
+        lx = np.cumprod(factors)  # As the l(x) column
+        v = discount_factors(np.full(len(q), float(rate)))  # As the v^t column
+        dx = np.where(np.isnan(shift(lx)), np.nan, lx * q)
+        dx[-1] = np.nan  # Matches d(x) for the last row in a Calc
+        columns = {
+            "D": v * lx,
+            "C": shift(v) * dx,
+        }
+        columns["C"][-1] = np.nan
+        columns["M"] = tail_sum(columns["C"])
+        columns["N"] = tail_sum(columns["D"])
+        columns["R"] = tail_sum(columns["M"])
+        columns["S"] = tail_sum(columns["N"])
+        for values in columns.values():
+            values.flags.writeable = False
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["D"])
+
+    def at(self, offset: int):
+        """
+        Returns (dict of read only views of each column starting at the offset,
+        the l(x) value at the offset) for a life whose ages start at that row.
+        Views share memory with the table.
+        """
+        views = {symbol: values[offset:] for symbol, values in self.columns.items()}
+        return views, self.columns["D"][offset]
 
+    def column(self, symbol: str, offset: int, base: float):
+        """
+        Returns (read only view of the column starting at the offset, factor to scale it by)
+        for a life starting at the offset with its own l(x) base.  Nothing is copied.
+        """
+        views, start = self.at(offset)
+        return views[symbol], base / start
 
 
 class MortalityTable(ABC):
     """ Abstract mortality table """
 
+    dtype = np.float64  # Precision of the table values, np.float64 or np.float32
+    max_commutation_tables = 8  # CommutationTables kept per table, least recently used are dropped first
+
     def __init__(self):
-        self.data = []
-        self.age_index = {}
+        self.data = np.empty((0, 0))  # Matrix of values with a row per age
+        self.ages = np.empty(0)  # Age for each row of the data
+        self.age_index = {}  # Age -> row in the data
+        self._commutation_tables = OrderedDict()  # Rate -> CommutationTable, least recently used first
+
+    def load(self, ages, data, dtype=None):
+        """
+        Sets the table values from an array of ages and a matrix of values with a row per age.
+        Missing values are NaN.  The data is read only once loaded.
+        The values are stored with the dtype given, or the dtype of the class if None.
+        l(x) values stay float64 as q(x) is calculated from the ratio of neighbouring
+        values, and only the q(x) are converted.
+        """
+        if dtype is not None:
+            self.dtype = dtype
+        if np.dtype(self.dtype) not in FLOAT_DTYPES:
+            raise MortalityTableError(f"Table values must be float64 or float32, not ({self.dtype})")
+        self.ages = read_only(np.ascontiguousarray(ages, dtype=np.float64))
+        self.data = read_only(
+            np.ascontiguousarray(data, dtype=self.dtype if self.table_type == "qx" else np.float64)
+        )
+        self.age_index = {age: row for row, age in enumerate(self.ages.tolist())}
+        # Identifies the table by its contents, so the key never outlives the data it describes
+        digest = hashlib.sha256(self.ages.tobytes())
+        digest.update(self.data.tobytes())
+        self._content_key = (str(self.data.dtype), self.data.shape, digest.hexdigest())
+        self.ultimate_col = self.data.shape[1] - 1  # Index for last column
+        self._ultimate = read_only(self.to_qx(self.data[:, self.ultimate_col]))
+
+    @classmethod
+    def from_arrays(cls, ages, data, dtype=None):
+        """
+        Creates the table directly from an array of ages and a matrix of values,
+        e.g. arrays in shared memory, without reading the CSV file or DataFrame.
+        """
+        table = cls.__new__(cls)
+        MortalityTable.__init__(table)
+        table.load(ages, data, dtype=dtype)
+        return table
+
+    def to_qx(self, values):
+        """ Converts a vector of table values to q(x) values according to the table type. """
+        if self.table_type == "qx":
+            return values
+        elif self.table_type == "lx":
+            return convert_lx_to_qx(values).astype(self.dtype, copy=False)
+        raise MortalityTableError(
+            f"Unknown table type {self.table_type}.  Check mortality table class is defined correctly."
+        )
+
+    def row(self, age):
+        """ Returns the row of the data for the age. """
+        try:
+            return self.age_index[age]
+        except KeyError:
+            raise MortalityTableError(f"Age {age} not found in the table")
 
     @abstractmethod
     def qx(self, age, **kwargs):
         """ returns a list of q values starting with the age requested """
 
+    def ultimate_index(self, age):
+        """ returns the row where the ultimate q values for the age start """
+        raise MortalityTableError(
+            f"Ultimate mortality rows not defined for {type(self).__name__}"
+        )
+
+    def ultimate_qx(self):
+        """ Returns a read only array of the ultimate q(x) values for every row of the table. """
+        return self._ultimate
+
+    def commutation_table(self, rate: float):
+        """
+        Returns the CommutationTable for this mortality table at the interest rate.
+        It is only calculated once for each rate, keeping the most recently used
+        max_commutation_tables rates.
+        """
+        tables = self._commutation_tables
+        if rate in tables:
+            tables.move_to_end(rate)
+            return tables[rate]
+        tables[rate] = CommutationTable(self.ultimate_qx(), rate)
+        while len(tables) > self.max_commutation_tables:
+            tables.popitem(last=False)
+        return tables[rate]
+
+    @property
+    def cache_key(self):
+        """
+        A hashable key identifying the table data, used to share results between Calcs.
+        Made from the class, the precision of q(x) and a hash of the values, so tables with the
+        same contents share a key and a different table never reuses another's key.
+        """
+        return (type(self), np.dtype(self.dtype).str) + self._content_key
+
 
 class OneDimensionTableMixIn:
     """
@@ -37,23 +200,16 @@ class OneDimensionTableMixIn:
 
     table_type = "qx"  # data is either 'qx' or 'lx'
 
-    def qx(self, age):
-        """ Returns a list of the future q(x) for the age. """
-        if age not in self.age_index.keys():
-            raise MortalityTableError(f"Age {age} not found in the table")
-        index = self.age_index[age]
-        values = [x[0] for x in self.data[index:]]
-
-        if self.table_type == "qx":
-            return values
+    def ultimate_index(self, age):
+        """ Returns the row where the q values for the age start. """
+        return self.row(age)
 
-        elif self.table_type == "lx":
-            return convert_lx_to_qx(values)
-
-        else:
-            raise MortalityTableError(
-                f"Unknown table type {self.table_type}.  Check mortality table class is defined correctly."
-            )
+    def qx(self, age, select=True):
+        """
+        Returns a read only array of the future q(x) for the age.
+        One dimensional tables have no select period so select is ignored.
+        """
+        return self._ultimate[self.ultimate_index(age) :]
 
 
 class TwoDimensionHorizontalTableMixIn:
@@ -62,33 +218,27 @@ class TwoDimensionHorizontalTableMixIn:
     and then ultimate mortality down the right hand column.
     """
 
+    def ultimate_index(self, age):
+        """ Returns the row where the ultimate q values for the age start. """
+        index = self.row(age) - self.ultimate_col
+        if index < 0:
+            raise MortalityTableError(f"Age {age} has no ultimate mortality in the table")
+        return index
+
     def qx(self, age, select=True):
         """
-        Returns a list of the future q(x) for the age.
+        Returns an array of the future q(x) for the age.
         Uses select mortality when select=True, ultimate mortality otherwise.
+        Ultimate mortality is a read only view of the table.
         """
-        if age not in self.age_index.keys():
-            raise MortalityTableError(f"Age {age} not found in the table")
-
-        if select:
-            index = self.age_index[age]
-            values = self.data[index]  # Select mortality
-            values.extend([x[self.ultimate_col] for x in self.data[index + 1 :]])
-
-        else:
-            index = self.age_index[age] - self.ultimate_col
-            values = [x[self.ultimate_col] for x in self.data[index:]]
-
-        if self.table_type == "qx":
-            return values
+        if not select:
+            return self._ultimate[self.ultimate_index(age) :]
 
-        elif self.table_type == "lx":
-            return convert_lx_to_qx(values)
-
-        else:
-            raise MortalityTableError(
-                f"Unknown table type {self.table_type}.  Check mortality table class is defined correctly."
-            )
+        index = self.row(age)
+        values = np.concatenate(
+            [self.data[index], self.data[index + 1 :, self.ultimate_col]]
+        )
+        return self.to_qx(values)
 
 
 class TwoDimensionDiagonalTableMixIn:
@@ -97,37 +247,28 @@ class TwoDimensionDiagonalTableMixIn:
     the right column for ultimate mortality values
     """
 
+    def ultimate_index(self, age):
+        """ Returns the row where the ultimate q values for the age start. """
+        return self.row(age)
+
     def qx(self, age, select=True):
         """
-        Returns a list of the future q(x) for the age.
+        Returns an array of the future q(x) for the age.
         Uses select mortality when select=True, ultimate mortality otherwise.
+        Ultimate mortality is a read only view of the table.
         """
-        if age not in self.age_index.keys():
-            raise MortalityTableError(f"Age {age} not found in the table")
+        if not select:
+            return self._ultimate[self.ultimate_index(age) :]
 
-        if select:
-            values = []
-            index = self.age_index[age]
-            for i in range(self.ultimate_col):
-                values.append(self.data[index + i][i])
-            values.extend(
-                [x[self.ultimate_col] for x in self.data[index + self.ultimate_col :]]
-            )
-
-        else:
-            index = self.age_index[age]
-            values = [x[self.ultimate_col] for x in self.data[index:]]
-
-        if self.table_type == "qx":
-            return values
-
-        elif self.table_type == "lx":
-            return convert_lx_to_qx(values)
-
-        else:
-            raise MortalityTableError(
-                f"Unknown table type {self.table_type}.  Check mortality table class is defined correctly."
-            )
+        index = self.row(age)
+        duration = np.arange(self.ultimate_col)
+        values = np.concatenate(
+            [
+                self.data[index + duration, duration],
+                self.data[index + self.ultimate_col :, self.ultimate_col],
+            ]
+        )
+        return self.to_qx(values)
 
 
 class CSVMortalityTable(MortalityTable):
@@ -146,8 +287,10 @@ class CSVMortalityTable(MortalityTable):
     age_column = ""  # The name of the column where age sits
     table_type = None  # data is either 'qx' or 'lx'
     value_columns = []  # The name of the value columns in the order to be read
+    binary_cache = True  # Keep a compiled binary copy of the CSV to memory map on later loads
+    cache_path = None  # Directory for the binary copy.  Defaults to ACTYMATH_CACHE_DIR or CACHE_PATH.
 
-    def __init__(self, filename=None, path=None):
+    def __init__(self, filename=None, path=None, dtype=None):
         super().__init__()
         if path is not None:
             self.path = path
@@ -166,15 +309,125 @@ class CSVMortalityTable(MortalityTable):
         if self.table_type not in ["qx", "lx"]:
             raise MortalityTableError("Table type must be 'qx' or 'lx'")
 
-        with open(f"{self.path}/{self.filename}") as f:
+        csv_path = os.path.abspath(f"{self.path}/{self.filename}")
+        arrays = self.read_binary(csv_path) if self.binary_cache else None
+        if arrays is None:
+            matrix = self.read_csv(csv_path)
+            arrays = matrix[:, 0].copy(), np.ascontiguousarray(matrix[:, 1:])
+            if self.binary_cache:
+                self.write_binary(csv_path, *arrays)
+
+        self.load(*arrays, dtype=dtype)
+
+    def read_csv(self, csv_path):
+        """ Parses the CSV file into a matrix with the ages in the first column. """
+        rows = []
+        with open(csv_path) as f:
             reader = csv.DictReader(f)
-            for i, row in enumerate(reader):
-                self.age_index[float(row[self.age_column])] = i
-                self.data.append(
-                    [float(row[x]) if row[x] else None for x in self.value_columns]
+            for row in reader:
+                rows.append(
+                    [float(row[self.age_column])]
+                    + [float(row[x]) if row[x] else np.nan for x in self.value_columns]
                 )
+        return np.array(rows, dtype=np.float64).reshape(-1, len(self.value_columns) + 1)
+
+    def binary_paths(self, csv_path):
+        """ Returns the paths of the binary matrix (.npy) and its header (.json) for the CSV file. """
+        key = json.dumps([csv_path, self.binary_header()])
+        name = hashlib.sha256(key.encode()).hexdigest()[:16]
+        stem = os.path.join(
+            self.cache_path or os.environ.get("ACTYMATH_CACHE_DIR", CACHE_PATH),
+            f"{os.path.splitext(os.path.basename(csv_path))[0]}-{name}",
+        )
+        return stem + ".npy", stem + ".json"
+
+    def binary_header(self):
+        """ The parts of the header that must match for the binary copy to be used. """
+        return {
+            "version": 2,
+            "age_column": self.age_column,
+            "value_columns": list(self.value_columns),
+            "table_type": self.table_type,
+        }
+
+    def read_binary(self, csv_path):
+        """
+        Returns (ages, values) viewing the memory mapped binary copy of the CSV file, or None if
+        missing or out of date.  A changed modification time is accepted when the CSV file hash still matches.
+        """
+        npy_path, json_path = self.binary_paths(csv_path)
+        try:
+            stat = os.stat(csv_path)
+            opened = _mapped_tables.get(npy_path)
+            if opened is not None and opened[0] == (stat.st_mtime_ns, stat.st_size):
+                return opened[1]
+
+            with open(json_path) as f:
+                header = json.load(f)
+            if any(header.get(k) != v for k, v in self.binary_header().items()):
+                return None
+            if (header["mtime_ns"], header["size"]) != (stat.st_mtime_ns, stat.st_size):
+                if header["sha256"] != _file_hash(csv_path):
+                    return None
+                header.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                _write_atomic(json_path, json.dumps(header).encode())
+            rows, columns = header["shape"]
+            flat = np.load(npy_path, mmap_mode="r")
+            if flat.shape != (rows * (columns + 1),):
+                return None
+            # The ages then the values row by row, so both are contiguous views of the map
+            arrays = flat[:rows], flat[rows:].reshape(rows, columns)
+            _mapped_tables[npy_path] = ((stat.st_mtime_ns, stat.st_size), arrays)
+            return arrays
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write_binary(self, csv_path, ages, values):
+        """
+        Saves a binary copy of the parsed CSV file, as the ages followed by the matrix of values.
+        Skipped if the cache directory is not writable.
+        """
+        npy_path, json_path = self.binary_paths(csv_path)
+        try:
+            os.makedirs(os.path.dirname(npy_path), exist_ok=True)
+            stat = os.stat(csv_path)
+            header = self.binary_header()
+            header.update(
+                csv_path=csv_path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                sha256=_file_hash(csv_path),
+                shape=list(values.shape),
+            )
+            temp_path = f"{npy_path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, np.concatenate([ages, values.ravel()]))
+            os.replace(temp_path, npy_path)
+            _write_atomic(json_path, json.dumps(header).encode())
+        except OSError:
+            pass
+
+
+# Binary tables already memory mapped in this process: .npy path -> ((CSV mtime, size), (ages, values))
+_mapped_tables = {}
+
+
+def _file_hash(path):
+    """ Returns the sha256 hex digest of a file. """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _write_atomic(path, content: bytes):
+    """ Writes the file via a temporary file so other processes never read it half written. """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    os.replace(temp_path, path)
 
-        self.ultimate_col = len(self.value_columns) - 1  # Index for last column
 
 class PandasMortalityTable(MortalityTable):
     """
@@ -193,7 +446,7 @@ class PandasMortalityTable(MortalityTable):
     value_columns = []  # The name of the value columns in the order to be read
 
 
-    def __init__(self, df=None):
+    def __init__(self, df=None, dtype=None):
         super().__init__()
         if df is not None:
             self.df = df
@@ -207,11 +460,11 @@ class PandasMortalityTable(MortalityTable):
         if self.table_type not in ["qx", "lx"]:
             raise MortalityTableError("Table type must be 'qx' or 'lx'")
 
-        self.data = df[self.value_columns].values.tolist()
-
-        self.age_index = {age: i for i, age in df[self.age_column].to_dict().items()}
-
-        self.ultimate_col = len(self.value_columns) - 1  # Index for last column
+        self.load(
+            self.df[self.age_column].to_numpy(dtype=np.float64),
+            self.df[self.value_columns].to_numpy(dtype=np.float64),
+            dtype=dtype,
+        )
 
 
 """Example tables"""
@@ -0,0 +1 @@
+""" Repeatable speed benchmarks for actymath.  Run with `python -m benchmarks run`. """
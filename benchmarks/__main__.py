@@ -0,0 +1,48 @@
+import argparse
+import sys
+
+from benchmarks import runner
+
+""" Command line for the benchmarks.
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and save the results as JSON")
+    run_parser.add_argument("names", nargs="*", help="Benchmark names or prefixes to run.  Default is all.")
+    run_parser.add_argument("--output", "-o", default="benchmarks.json", help="JSON file for the results")
+    run_parser.add_argument("--repeat", "-r", type=int, help="Timed repeats for every benchmark")
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare results with a baseline and exit with 1 on any regression"
+    )
+    compare_parser.add_argument("baseline", help="JSON results to compare against")
+    compare_parser.add_argument("current", help="JSON results for the change being tested")
+    compare_parser.add_argument(
+        "--threshold", "-t", type=float, default=0.25, help="Relative slow down that is a regression"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = runner.run(args.names, repeat=args.repeat)
+        runner.save(results, args.output)
+        for name, result in results["results"].items():
+            print(f"{name:<40} {result['min'] * 1000:10.3f} ms")
+        print(f"Saved to {args.output}")
+        return 0
+
+    rows = runner.compare(
+        runner.load(args.baseline), runner.load(args.current), threshold=args.threshold
+    )
+    print(runner.format_comparison(rows))
+    return 1 if any(row["status"] == "regression" for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
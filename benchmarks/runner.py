@@ -0,0 +1,149 @@
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+import actymath
+from benchmarks.suite import BENCHMARKS
+
+""" Running the benchmarks, saving the results as JSON and comparing them with a baseline. """
+
+
+# Minimum seconds for each timed repeat
+MIN_TIME = 0.05
+
+
+def metadata():
+    """ Returns a dictionary describing the machine and software the benchmarks ran on. """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "actymath": actymath.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def run(names=None, repeat=None):
+    """
+    Runs the benchmarks and returns the results with the run metadata.
+
+    Params:
+    - names (list of str) - optional names, or name prefixes, of the benchmarks to run.  Default is all.
+    - repeat (int) - optional number of timed repeats, overriding each benchmark's default.
+
+    Returns:
+    - Dictionary with the "metadata" and the "results" for each benchmark in seconds per call
+    """
+    results = {}
+    for name, (setup, default_repeat) in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        function = setup()
+        start = time.perf_counter()
+        function()  # Warm up
+        # Fast benchmarks are looped so each timing is long enough to be repeatable
+        number = max(1, min(10000, int(MIN_TIME / max(time.perf_counter() - start, 1e-9))))
+        times = []
+        for _ in range(repeat or default_repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            times.append((time.perf_counter() - start) / number)
+        results[name] = {
+            "repeat": len(times),
+            "number": number,
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "times": times,
+        }
+    return {"metadata": metadata(), "results": results}
+
+
+def save(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold: float = 0.25):
+    """
+    Compares the fastest times of each benchmark with a baseline.
+
+    Params:
+    - baseline (dict) - results from run() (or loaded from JSON) to compare against
+    - current (dict) - results from run() for the change being tested
+    - threshold (float) - relative slow down that counts as a regression.  Default is 0.25 (25% slower).
+
+    Returns:
+    - List of dictionaries with the name, baseline and current times, ratio and status
+      (regression, improvement, ok, new or missing) of each benchmark
+    """
+    rows = []
+    names = list(baseline["results"]) + [
+        name for name in current["results"] if name not in baseline["results"]
+    ]
+    for name in names:
+        before = baseline["results"].get(name, {}).get("min")
+        after = current["results"].get(name, {}).get("min")
+        if before is None or after is None:
+            ratio = None
+            status = "new" if before is None else "missing"
+        else:
+            ratio = after / before if before else float("inf")
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold):
+                status = "improvement"
+            else:
+                status = "ok"
+        rows.append(
+            {
+                "name": name,
+                "baseline": before,
+                "current": after,
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+    return rows
+
+
+def format_comparison(rows):
+    """ Returns the comparison as a printable table. """
+    width = max([len(row["name"]) for row in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'base ms':>10}  {'now ms':>10}  {'ratio':>6}  status"]
+    for row in rows:
+        before = f"{row['baseline'] * 1000:.3f}" if row["baseline"] is not None else "-"
+        after = f"{row['current'] * 1000:.3f}" if row["current"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        lines.append(
+            f"{row['name']:<{width}}  {before:>10}  {after:>10}  {ratio:>6}  {row['status']}"
+        )
+    return "\n".join(lines)
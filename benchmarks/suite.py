@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from actymath import Calc, kernels, tables
+from actymath.indexers import SliceNIndexer, SliceToEndIndexer
+from actymath.model_points import ModelPoints
+from actymath.point import quote
+from actymath.portfolio import Portfolio
+
+""" The benchmark scenarios.  Each returns a function to time, after any setup that is not timed. """
+
+# Benchmark name -> (setup function, default number of timed repeats)
+BENCHMARKS = {}
+
+# Tables shipped with actymath
+SHIPPED_TABLES = [
+    tables.TestTable,
+    tables.TestTable2,
+    tables.AMC00,
+    tables.A1967_70_Exams,
+    tables.A1967_70,
+]
+
+
+def benchmark(name: str, repeat: int = 5):
+    """ Registers a benchmark setup function under the name. """
+
+    def register(setup):
+        BENCHMARKS[name] = (setup, repeat)
+        return setup
+
+    return register
+
+
+def _table_load(table_class):
+    def setup():
+        def run():
+            tables._mapped_tables.clear()  # Load from the binary copy, not the in-process memo
+            table_class()
+
+        return run
+
+    return setup
+
+
+def _table_qx(table_class):
+    def setup():
+        table = table_class()
+        ages = [int(age) for age in table.ages if 20 <= age <= 70] or [int(table.ages[0])]
+
+        def run():
+            for age in ages:
+                table.qx(age, select=True)
+
+        return run
+
+    return setup
+
+
+for _table in SHIPPED_TABLES:
+    benchmark(f"tables.load.{_table.__name__}")(_table_load(_table))
+    benchmark(f"tables.qx.{_table.__name__}")(_table_qx(_table))
+
+
+FULL_COLUMNS = [
+    "a_due(x1)[n1]",
+    "a(x1)[n1]",
+    "A(x1)[n1]",
+    "EA(x1)[n1]",
+    "NP(x1)[n1]",
+    "IA(x1)[n1]",
+    "IEA(x1)[n1]",
+    "Ia_due(x1)[n1]",
+    "a_due(x1)",
+    "A(x1)",
+    "NP(x1)",
+]
+
+
+@benchmark("calc.single_life")
+def single_life():
+    qx = tables.AMC00().qx(40)
+
+    def run():
+        calc = Calc()
+        calc.add_life(40, qx)
+        calc.add_i(rate=0.04)
+        calc.add_term(n=20)
+        calc.populate(FULL_COLUMNS)
+
+    return run
+
+
+@benchmark("calc.5_lives_20_terms", repeat=3)
+def lives_and_terms():
+    table = tables.AMC00()
+    qxs = [table.qx(age)[:60] for age in (30, 35, 40, 45, 50)]
+    columns = [
+        f"{formula}(x{life})[n{term}]"
+        for formula in ("a_due", "A", "EA", "NP")
+        for life in range(1, 6)
+        for term in range(1, 21)
+    ]
+
+    def run():
+        calc = Calc()
+        for qx, age in zip(qxs, (30, 35, 40, 45, 50)):
+            calc.add_life(age, qx)
+        calc.add_i(rate=0.04)
+        for n in range(1, 21):
+            calc.add_term(n=n)
+        calc.populate(columns)
+
+    return run
+
+
+@benchmark("point.quote")
+def point_quote():
+    table = tables.AMC00()
+
+    def run():
+        quote(table, 40, 20, 0.04)
+
+    return run
+
+
+def _portfolio(size, chunk_size=10000):
+    def setup():
+        rng = np.random.default_rng(0)
+        ages = rng.integers(20, 65, size)
+        terms = rng.integers(5, 40, size)
+        rates = rng.choice([0.02, 0.03, 0.04], size)
+        table = tables.AMC00()
+
+        def run():
+            # Valued in chunks, as a policy file would be streamed
+            for start in range(0, size, chunk_size):
+                end = start + chunk_size
+                Portfolio(
+                    ages[start:end], terms[start:end], rates[start:end], tables=table
+                ).value(["a_due(x1)[n1]", "A(x1)[n1]", "NP(x1)[n1]"])
+
+        return run
+
+    return setup
+
+
+benchmark("portfolio.10k", repeat=3)(_portfolio(10000))
+benchmark("portfolio.100k", repeat=1)(_portfolio(100000))
+
+
+@benchmark("model_points.10k", repeat=3)
+def model_points():
+    # Ages in 5 year bands and whole terms in 5 years, so many policies share a basis
+    rng = np.random.default_rng(0)
+    policies = pd.DataFrame(
+        {
+            "age": rng.integers(4, 13, 10000) * 5,
+            "term": rng.integers(1, 7, 10000) * 5,
+            "rate": rng.choice([0.03, 0.04], 10000),
+            "sum_assured": rng.integers(1, 100, 10000) * 1000.0,
+        }
+    )
+    table = tables.AMC00()
+
+    def run():
+        ModelPoints(policies, table).value(["a_due(x1)[n1]", "A(x1)[n1]", "NP(x1)[n1]"])
+
+    return run
+
+
+def _tail_sum(rows, pandas_rolling=False):
+    """ Tail sums used by the commutation columns, with the kernel or the pandas rolling sum it replaced. """
+
+    def setup():
+        values = pd.Series(np.random.default_rng(0).random(rows))
+        indexer = SliceToEndIndexer()
+
+        def run():
+            if pandas_rolling:
+                values.rolling(indexer).sum()
+            else:
+                pd.Series(kernels.tail_sum(values.to_numpy()), index=values.index)
+
+        return run
+
+    return setup
+
+
+def _window_sum(rows, pandas_rolling=False):
+    def setup():
+        values = pd.Series(np.random.default_rng(0).random(rows))
+        n = np.random.default_rng(1).integers(0, 20, rows).astype(float)
+        indexer = SliceNIndexer(n=n)
+
+        def run():
+            if pandas_rolling:
+                values.rolling(indexer, min_periods=0).sum()
+            else:
+                kernels.window_sum(values.to_numpy(), n)
+
+        return run
+
+    return setup
+
+
+for _rows in (100, 1000):
+    benchmark(f"kernels.tail_sum.{_rows}")(_tail_sum(_rows))
+    benchmark(f"kernels.tail_sum.{_rows}.pandas_rolling")(_tail_sum(_rows, True))
+    benchmark(f"kernels.window_sum.{_rows}")(_window_sum(_rows))
+    benchmark(f"kernels.window_sum.{_rows}.pandas_rolling")(_window_sum(_rows, True))
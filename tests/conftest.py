@@ -0,0 +1,25 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Binary copies of the tables loaded while the tests are collected
+collection_cache_dir = tempfile.mkdtemp(prefix="actymath-")
+
+
+def pytest_configure(config):
+    """ Tables loaded while collecting the tests keep their binary copies out of ~/.cache. """
+    os.environ["ACTYMATH_CACHE_DIR"] = collection_cache_dir
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(collection_cache_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    """ Each test saves the binary copies of the tables it loads in its own directory. """
+    path = tmp_path / "cache"
+    monkeypatch.setenv("ACTYMATH_CACHE_DIR", str(path))
+    return path
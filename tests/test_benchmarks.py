@@ -0,0 +1,52 @@
+import json
+
+from benchmarks import runner
+from benchmarks.__main__ import main
+from benchmarks.suite import BENCHMARKS
+
+
+def test_benchmark_scenarios_registered():
+    for name in [
+        "tables.load.AMC00",
+        "tables.qx.A1967_70_Exams",
+        "calc.single_life",
+        "calc.5_lives_20_terms",
+        "portfolio.10k",
+        "portfolio.100k",
+    ]:
+        assert name in BENCHMARKS
+
+
+def test_benchmark_run_saves_json_with_metadata(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, "MIN_TIME", 0)
+    output = tmp_path / "results.json"
+    assert main(["run", "tables.qx.TestTable", "--repeat", "2", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert list(results["results"]) == ["tables.qx.TestTable", "tables.qx.TestTable2"]
+    assert results["results"]["tables.qx.TestTable"]["repeat"] == 2
+    for key in ["timestamp", "python", "platform", "cpu_count", "numpy", "pandas"]:
+        assert key in results["metadata"]
+
+
+def result(**times):
+    return {"metadata": {}, "results": {name: {"min": time} for name, time in times.items()}}
+
+
+def test_benchmark_compare_flags_regressions(tmp_path):
+    rows = runner.compare(
+        result(fast=1.0, same=1.0, slow=1.0, gone=1.0),
+        result(fast=0.5, same=1.1, slow=1.5, added=1.0),
+    )
+    assert {row["name"]: row["status"] for row in rows} == {
+        "fast": "improvement",
+        "same": "ok",
+        "slow": "regression",
+        "gone": "missing",
+        "added": "new",
+    }
+
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    runner.save(result(slow=1.0), baseline)
+    runner.save(result(slow=1.5), current)
+    assert main(["compare", str(baseline), str(current)]) == 1
+    assert main(["compare", str(baseline), str(current), "--threshold", "0.6"]) == 0
@@ -1,7 +1,13 @@
+import pickle
+import tracemalloc
+
+import numpy as np
 import pandas as pd
+import pytest
 from actymath import Calc, columns
 from actymath.calc import register
-from actymath.tables import A1967_70_Exams
+from actymath.exceptions import ActyMathError
+from actymath.tables import A1967_70_Exams, AMC00
 
 
 def get_qx():
@@ -29,3 +35,367 @@ def test_calc_add_life():
     assert "q(x1)" in calc.columns
     assert calc["x1"].iloc[0] == 30
 
+
+
+def get_two_life_calc():
+    calc = Calc()
+    table = A1967_70_Exams()
+    calc.add_life(age=30, qx=table.qx(30, select=True)[:60])
+    calc.add_life(age=40, qx=table.qx(40, select=True)[:60])
+    calc.add_i(rate=0.04)
+    calc.add_term(n=10)
+    calc.add_term(n=20)
+    calc.populate(
+        [f"A(x{life})[n{term}]" for life in (1, 2) for term in (1, 2)] + ["p(x1)"]
+    )
+    return calc
+
+
+def test_calc_copy_lives_are_independent():
+    calc = Calc()
+    calc.add_life(age=40, table=AMC00())
+    calc.add_i(rate=0.04)
+    copy = calc.copy()
+    copy.update_life(1, qx=[0.5] * 20, age=50)
+    copy.add_life(age=30, table=AMC00())
+    assert calc.lives[1]["age"] == 40
+    assert calc.lives[1]["table"] is not None
+    assert calc.basis(1) is not None
+    assert list(calc.lives) == [1]
+    assert copy.lives[1]["age"] == 50
+
+
+def test_calc_set_i_drops_interest_dependents_only():
+    calc = get_two_life_calc()
+    dropped = calc.set_i(0.05)
+    assert "v^t" in dropped
+    assert "D(x2)" in dropped
+    assert "A(x1)[n2]" in dropped
+    for column in ["l(x1)", "d(x2)", "p(x1)", "n1", "q(x1)", "i"]:
+        assert column in calc.columns
+    assert calc["i"].iloc[0] == 0.05
+
+    # Dropped columns are recalculated when next populated
+    calc.populate("A(x1)[n1]")
+    fresh = Calc()
+    fresh.add_life(age=30, qx=A1967_70_Exams().qx(30, select=True)[:60])
+    fresh.add_i(rate=0.05)
+    fresh.add_term(n=10)
+    fresh.populate("A(x1)[n1]")
+    assert (calc["A(x1)[n1]"] == fresh["A(x1)[n1]"]).all()
+
+
+def test_calc_update_life_keeps_other_lives():
+    calc = get_two_life_calc()
+    qx = A1967_70_Exams().qx(35, select=True)[:60]
+    dropped = calc.update_life(1, qx=qx, age=35)
+    assert set(dropped) == {
+        "p(x1)",
+        "l(x1)",
+        "d(x1)",
+        "C(x1)",
+        "D(x1)",
+        "M(x1)",
+        "A(x1)[n1]",
+        "A(x1)[n2]",
+    }
+    assert "A(x2)[n1]" in calc.columns
+    assert "v^t" in calc.columns
+    assert calc["x1"].iloc[0] == 35
+    assert calc["q(x1)"].iloc[0] == qx[0]
+
+
+def test_calc_update_term_keeps_other_terms():
+    calc = get_two_life_calc()
+    dropped = calc.update_term(1, n=5)
+    assert set(dropped) == {"A(x1)[n1]", "A(x2)[n1]"}
+    assert "A(x1)[n2]" in calc.columns
+    assert calc["n1"].iloc[0] == 5
+    calc.populate("A(x1)[n1]")
+    assert calc["A(x1)[n1]"].iloc[6] == 0
+
+
+def test_calc_lazy_populates_on_read():
+    calc = Calc(lazy=True)
+    calc.add_life(age=30, qx=get_qx())
+    calc.add_i(rate=0.04)
+    calc.add_term(n=10)
+    assert "D(x1)" not in calc.columns
+    value = calc["A(x1)[n1]"].iloc[0]
+    assert "D(x1)" in calc.columns
+    assert "N(x1)" not in calc.columns  # Only what was needed is calculated
+
+    eager = Calc()
+    eager.add_life(age=30, qx=get_qx())
+    eager.add_i(rate=0.04)
+    eager.add_term(n=10)
+    eager.populate("A(x1)[n1]")
+    assert value == eager["A(x1)[n1]"].iloc[0]
+
+    # Dropped columns are recalculated on the next read
+    calc.set_i(0.05)
+    assert "A(x1)[n1]" not in calc.columns
+    assert calc["A(x1)[n1]"].iloc[0] != value
+
+    # Lists of columns are populated too
+    assert calc[["a_due(x1)[n1]", "EA(x1)[n1]"]].shape[1] == 2
+
+    # Columns that cannot be calculated are missing like any other column
+    with pytest.raises(KeyError):
+        calc["q(x9)"]
+    with pytest.raises(KeyError):
+        calc["D(x9)"]
+
+
+def test_calc_not_lazy_by_default():
+    calc = Calc()
+    calc.add_life(age=30, qx=get_qx())
+    calc.add_i(rate=0.04)
+    with pytest.raises(KeyError):
+        calc["D(x1)"]
+
+
+def test_calc_add_life_from_table():
+    calc = Calc()
+    calc.add_life(age=30, table=A1967_70_Exams(), select=False)
+    assert calc["q(x1)"].iloc[0] == pytest.approx(0.00065368, abs=0.00000001)
+    with pytest.raises(ActyMathError):
+        calc.add_life(age=30)
+
+
+def test_calc_add_i_rate_for_each_period():
+    calc = Calc()
+    calc.add_life(age=30, qx=get_qx()[:10])
+    calc.add_i(rate=[0.02, 0.03, 0.04])
+    assert list(calc["i"]) == [0.02, 0.03, 0.04] + [0.04] * 7  # Continues at the last rate
+    calc.populate("v^t")
+    assert calc["v^t"].iloc[0] == 1
+    assert calc["v^t"].iloc[3] == pytest.approx(1 / (1.02 * 1.03 * 1.04))
+    assert calc["v^t"].iloc[9] == pytest.approx(1 / (1.02 * 1.03 * 1.04 ** 7))
+
+
+def test_calc_add_i_spot_curve():
+    spot = [0.02, 0.025, 0.03]
+    calc = Calc()
+    calc.add_life(age=30, qx=get_qx()[:10])
+    calc.add_i(spot=spot)
+    calc.populate("v^t")
+    for t in (1, 2, 3):
+        assert calc["v^t"].iloc[t] == pytest.approx(1.0 / (1 + spot[t - 1]) ** t)
+    assert calc["v^t"].iloc[8] == pytest.approx(1.03 ** -8)  # Continues at the last spot rate
+    with pytest.raises(ActyMathError):
+        calc.add_i(rate=0.04, spot=spot)
+
+
+def test_calc_flat_curve_matches_fixed_rate():
+    fixed = Calc()
+    fixed.add_life(age=30, qx=get_qx())
+    fixed.add_i(rate=0.04)
+    fixed.add_term(n=20)
+    curve = Calc()
+    curve.add_life(age=30, qx=get_qx())
+    curve.add_i(spot=[0.04] * 5)
+    curve.add_term(n=20)
+    for column in ["A(x1)[n1]", "a_due(x1)[n1]", "IA(x1)"]:
+        fixed.populate(column)
+        curve.populate(column)
+        expected = fixed[column].to_numpy()
+        assert curve[column].to_numpy() == pytest.approx(expected, abs=1e-9 * expected.max())
+
+
+def test_calc_set_i_with_curve_recalculates_annuity():
+    calc = Calc()
+    calc.add_life(age=30, qx=get_qx())
+    calc.add_i(rate=0.04)
+    calc.add_term(n=3)
+    calc.populate("a_due(x1)[n1]")
+    rates = [0.01, 0.05, 0.09]
+    calc.set_i(rate=rates)
+    calc.populate("a_due(x1)[n1]")
+    p = 1 - calc["q(x1)"].to_numpy()
+    expected = 1 + p[0] / 1.01 + p[0] * p[1] / (1.01 * 1.05)
+    assert calc["a_due(x1)[n1]"].iloc[0] == pytest.approx(expected)
+
+
+def test_calc_basis_includes_each_period_rate():
+    table = A1967_70_Exams()
+    calc = Calc()
+    calc.add_life(age=30, table=table)
+    calc.add_i(rate=[0.03, 0.04])
+    basis = calc.basis(1)
+    assert basis[3] == tuple(calc["i"])
+
+
+def test_calc_profile_records_columns():
+    calc = Calc()
+    calc.add_life(age=30, qx=get_qx())
+    calc.add_i(rate=0.04)
+    calc.add_term(n=10)
+    calc.populate("D(x1)")
+    assert calc.profiler is None
+    with calc.profile() as profile:
+        calc.populate(["a_due(x1)[n1]", "A(x1)[n1]"])
+        calc.populate("a_due(x1)[n1]")
+    assert calc.profiler is None
+    assert not tracemalloc.is_tracing()  # Only traced while profiling
+    assert profile.seconds > 0
+    assert profile.plans == 2
+    assert profile.peak_bytes >= len(calc.columns) * len(calc) * 8
+
+    frame = profile.to_frame()
+    rows = frame.set_index("column")
+    assert rows.loc["N(x1)", "computed"] == 1
+    assert rows.loc["N(x1)", "class"] == "Nx"
+    assert rows.loc["N(x1)", "bytes"] >= len(calc) * 8  # The tail sum and any temporaries
+    assert rows.loc["D(x1)", "skipped"] == 1  # Already in the Calc
+    assert rows.loc["a_due(x1)[n1]", "skipped"] == 1
+    assert rows.loc["a_due(x1)[n1]", "resolve_seconds"] > 0
+    assert list(frame["seconds"]) == sorted(frame["seconds"], reverse=True)
+
+    by_class = profile.to_frame(by="class").set_index("class")
+    assert by_class.loc["Nx", "computed"] == 1
+    assert "Profile:" in str(profile)
+
+
+def test_calc_basis_includes_base():
+    table = A1967_70_Exams()
+    calc = Calc()
+    calc.add_life(age=30, table=table)
+    calc.add_life(age=30, table=table, base=100000)
+    calc.add_i(rate=0.04)
+    assert calc.basis(1)[-1] == columns.l_x.base
+    assert calc.basis(2)[-1] == 100000
+    calc.populate(["D(x1)", "D(x2)"])
+    assert calc["D(x2)"].iloc[5] == pytest.approx(
+        calc["D(x1)"].iloc[5] * 100000 / columns.l_x.base
+    )
+
+
+@pytest.mark.parametrize("age", [20, 45, 70])
+def test_calc_float32_within_error_bound(age):
+    results = {}
+    for dtype in ["float64", "float32"]:
+        calc = Calc(column_dtype=dtype)
+        calc.add_life(age=age, table=AMC00(dtype=dtype))
+        calc.add_i(rate=0.04)
+        calc.add_term(n=1)
+        calc.add_term(n=10)
+        calc.populate(
+            ["NP(x1)[n2]", "IA(x1)[n2]", "a_due(x1)", "A(x1)", "A(x1)[n1]", "M(x1)", "S(x1)"]
+        )
+        results[dtype] = calc
+    assert (results["float32"].dtypes == "float32").all()
+    assert results["float32"].memory_usage(index=False).sum() * 2 == (
+        results["float64"].memory_usage(index=False).sum()
+    )
+    for column in ["NP(x1)[n2]", "IA(x1)[n2]", "a_due(x1)", "A(x1)", "M(x1)", "S(x1)"]:
+        np.testing.assert_allclose(
+            results["float32"][column][:40], results["float64"][column][:40], rtol=1e-5
+        )
+    # Differences of two tail sums, M(x) - M(x+1), are taken in float64 before rounding
+    np.testing.assert_allclose(
+        results["float32"]["A(x1)[n1]"][:1], results["float64"]["A(x1)[n1]"][:1], rtol=1e-6
+    )
+
+
+def test_calc_column_dtype_checked():
+    with pytest.raises(ActyMathError):
+        Calc(column_dtype="int32")
+
+
+def get_truncation_calc(horizon=None, rate=0.04):
+    table = AMC00()
+    calc = Calc(horizon=horizon)
+    calc.add_life(age=40, table=table)
+    calc.add_life(age=30, qx=table.qx(30))
+    calc.add_i(rate=rate)
+    calc.add_term(n=3)
+    calc.add_term(n=10)
+    return calc
+
+
+@pytest.mark.parametrize("rate", [0.04, [0.01, 0.02, 0.05] + [0.03] * 80])
+def test_calc_set_horizon_keeps_values_within_horizon(rate):
+    requested = [
+        "a_due(x1)[n2]",
+        "a(x2)[n2]",
+        "NP(x1)[n1]",
+        "Ia_due(x2)[n2]",
+        "IA(x1)[n2]",
+        "S(x2)",
+        "R(x1)",
+        "dA(x2)[n2]/di",
+        "d2a_due(x1)[n2]/di2",
+    ]
+    full = get_truncation_calc(rate=rate)
+    full.populate(requested)
+
+    truncated = get_truncation_calc(rate=rate)
+    assert truncated.set_horizon() == 12  # Longest term of 10 plus one, for t = 0 to 11
+    truncated.populate(requested)
+    explicit = get_truncation_calc(horizon=11, rate=rate)
+    explicit.populate(requested)
+    for calc in [truncated, explicit]:
+        assert len(calc) == 12
+        for column in requested:
+            np.testing.assert_allclose(
+                calc[column][:11], full[column][:11], rtol=1e-11, atol=1e-9
+            )
+
+
+def test_calc_set_horizon_after_populate():
+    calc = Calc()
+    calc.add_life(age=40, table=AMC00())
+    calc.add_i(rate=0.04)
+    calc.add_term(n=3)
+    calc.populate("N(x1)")
+    values = calc["N(x1)"][:5].to_numpy()
+    assert calc.set_horizon(horizon=4) == 5
+    assert list(calc.index) == [0, 1, 2, 3, 4]
+    np.testing.assert_array_equal(calc["N(x1)"], values)
+    assert calc._mgr.nblocks == 1
+
+    with pytest.raises(ActyMathError):
+        Calc().set_horizon()
+
+
+def test_calc_set_horizon_on_copy_leaves_original():
+    calc = Calc()
+    calc.add_life(age=40, qx=[0.01] * 50)
+    calc.add_i(rate=0.04)
+    calc.add_term(n=10)
+    calc.populate("a_due(x1)")
+    expected = calc["a_due(x1)"].iloc[0]
+
+    copy = calc.copy()
+    copy.set_horizon(12)
+    calc.invalidate("q(x1)")
+    calc.populate("a_due(x1)")
+    assert calc["a_due(x1)"].iloc[0] == pytest.approx(expected)
+    assert len(calc.lives[1]["tail_qx"]) == 0
+
+
+def test_calc_terms_must_end_before_horizon():
+    with pytest.raises(ActyMathError):
+        get_truncation_calc(horizon=10)  # Adds a term of 10
+    calc = get_truncation_calc(horizon=11)
+    with pytest.raises(ActyMathError):
+        calc.update_term(2, n=11)
+    calc = get_truncation_calc()
+    with pytest.raises(ActyMathError):
+        calc.set_horizon(horizon=10)
+    assert len(calc) > 12  # Not cut
+
+
+
+def test_calc_pickles():
+    calc = Calc()
+    calc.add_life(age=40, table=AMC00())
+    calc.add_i(rate=0.04)
+    calc.add_term(n=10)
+    calc.populate(["A(x1)[n1]", "dA(x1)[n1]/di", "d2a_due(x1)[n1]/di2"])
+    copy = pickle.loads(pickle.dumps(calc))
+    pd.testing.assert_frame_equal(copy, calc)
+    assert copy.lives[1]["age"] == 40
+    copy.populate("NP(x1)[n1]")  # Still calculates after unpickling
+    assert copy["NP(x1)[n1]"].iloc[0] > 0
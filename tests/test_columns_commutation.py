@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 from actymath import Calc
-from actymath.tables import A1967_70_Exams
+from actymath import tables
+from actymath.tables import AMC00, A1967_70_Exams
 
 # A1967-70 table - Actuarial Green tables for testing
 table = A1967_70_Exams()
@@ -49,3 +51,109 @@ def test_Sx1():
     calc.populate("S(x1)")
     assert calc["S(x1)"].iloc[0] == pytest.approx(18051194)
     assert calc["S(x1)"].iloc[54] == pytest.approx(627007.87)
+
+
+def test_commutation_cache_shares_columns_between_calcs(monkeypatch):
+    from actymath.columns import commutation
+    from actymath.tables import AMC00
+
+    shared = commutation.CommutationCache()
+    monkeypatch.setattr(commutation, "cache", shared)
+
+    first = Calc()
+    first.add_life(40, table=AMC00())
+    first.add_i(rate=0.04)
+    first.add_term(n=10)
+    first.populate("a_due(x1)[n1]")
+    assert shared.stats["hits"] == 0
+    assert len(shared) == 2  # D and N
+
+    second = Calc()
+    second.add_life(40, table=AMC00())  # Another instance of the same table
+    second.add_i(rate=0.04)
+    second.add_term(n=10)
+    second.populate("a_due(x1)[n1]")
+    assert shared.stats["hits"] == 2
+    assert "v^t" not in second.columns  # Dependencies of cached columns are skipped
+    assert "l(x1)" not in second.columns
+    assert (second["a_due(x1)[n1]"] == first["a_due(x1)[n1]"]).all()
+
+    # A different rate is a different basis
+    third = Calc()
+    third.add_life(40, table=AMC00())
+    third.add_i(rate=0.05)
+    third.populate("D(x1)")
+    assert shared.stats["hits"] == 2
+    assert third["D(x1)"].iloc[1] != first["D(x1)"].iloc[1]
+
+
+def test_commutation_cache_ignores_lives_without_table(monkeypatch):
+    from actymath.columns import commutation
+
+    shared = commutation.CommutationCache()
+    monkeypatch.setattr(commutation, "cache", shared)
+    other = Calc()
+    other.add_life(0, q0)
+    other.add_i(rate=0.04)
+    other.populate("N(x1)")
+    assert len(shared) == 0
+    assert shared.stats["misses"] == 0
+
+
+def test_commutation_cache_evicts_least_recently_used():
+    from actymath.columns.commutation import CommutationCache
+
+    lru = CommutationCache(max_bytes=3 * 800)
+    for key in "abc":
+        lru.put(key, np.zeros(100))
+    assert lru.get("a") is not None  # a is now most recently used
+    lru.put("d", np.zeros(100))
+    assert lru.get("b") is None
+    assert lru.get("a") is not None
+    assert lru.stats["evictions"] == 1
+    assert lru.stats["nbytes"] == 3 * 800
+    with pytest.raises(ValueError):
+        lru.get("a")[0] = 1.0  # Cached vectors are read only
+
+
+@pytest.mark.parametrize("table_class", [A1967_70_Exams, AMC00])
+def test_commutation_columns_from_commutation_table(table_class):
+    def get_calc(**life):
+        calc = Calc()
+        calc.add_life(45, **life)
+        calc.add_i(rate=0.04)
+        calc.add_term(n=10)
+        return calc
+
+    required = ["D(x1)", "M(x1)", "R(x1)", "IA(x1)[n1]"]
+    viewed = get_calc(table=table_class(), select=False)
+    plan = viewed.plan(required)
+    assert "l(x1)" not in [step.column for step in plan]  # Read from the table
+    plan.execute()
+
+    computed = get_calc(qx=table_class().qx(45, select=False))
+    computed.populate(required)
+    for column in required:
+        assert viewed[column].values == pytest.approx(
+            computed[column].values, rel=1e-10, abs=1e-9, nan_ok=True
+        )
+
+
+def test_cache_key_comes_from_table_contents():
+    ages = list(range(20, 121))
+
+    def a_term(rate_of_mortality):
+        table = tables.TestTable.from_arrays(ages, [[rate_of_mortality]] * len(ages))
+        calc = Calc()
+        calc.add_life(age=30, table=table)
+        calc.add_i(rate=0.04)
+        calc.add_term(n=10)
+        calc.populate("A(x1)[n1]")
+        return table.cache_key, calc["A(x1)[n1]"].iloc[0]
+
+    # Each table is garbage collected before the next, so its id can be reused
+    first_key, first = a_term(0.001)
+    second_key, second = a_term(0.002)
+    assert first_key != second_key
+    assert second == pytest.approx(2 * first, rel=0.01)
+    assert a_term(0.001)[0] == first_key
@@ -50,3 +50,22 @@ def test_dx2_raises_error():
 #     assert calc["e(x1)"].iloc[0] == pytest.approx(73.321, abs=0.001)
 #     assert calc["e(x1)"].iloc[4] == pytest.approx(69.493, abs=0.001)
 #     assert calc["e(x1)"].iloc[54] == pytest.approx(22.099, abs=0.001)
+
+
+def test_lx1_base():
+    scaled = Calc()
+    scaled.add_life(0, q0, base=100000)
+    scaled.add_i(rate=0.04)
+    scaled.populate(["l(x1)", "d(x1)", "a_due(x1)"])
+    calc.populate(["l(x1)", "a_due(x1)"])
+    assert scaled["l(x1)"].iloc[0] == 100000
+    assert scaled["l(x1)"].iloc[4] == pytest.approx(34398.727 * 100000 / 34481.408)
+    assert scaled["a_due(x1)"].iloc[0] == pytest.approx(calc["a_due(x1)"].iloc[0])
+
+
+def test_lx1_matches_survivorship_loop():
+    calc.populate("l(x1)")
+    expected = [34481.408]
+    for q in calc["q(x1)"].iloc[:-1]:
+        expected.append(expected[-1] * (1 - q))
+    assert calc["l(x1)"].tolist() == expected
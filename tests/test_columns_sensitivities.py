@@ -0,0 +1,76 @@
+import pytest
+from actymath import Calc
+from actymath.columns.sensitivities import derivative
+from actymath.exceptions import ActyMathError
+from actymath.tables import A1967_70_Exams
+
+table = A1967_70_Exams()
+q45 = table.qx(45, select=True)
+rates = [0.03, 0.035, 0.04]
+bump = 1e-4
+
+
+def get_calc(shift=0.0):
+    calc = Calc()
+    calc.add_life(45, q45)
+    calc.add_i(rate=[rate + shift for rate in rates])
+    calc.add_term(n=10)
+    return calc
+
+
+calc = get_calc()
+up = get_calc(bump)
+down = get_calc(-bump)
+
+
+def test_derivative_names():
+    assert derivative("A(x1)[n1]") == "dA(x1)[n1]/di"
+    assert derivative("A(x1)[n1]", 2) == "d2A(x1)[n1]/di2"
+
+
+@pytest.mark.parametrize(
+    "column",
+    [
+        "v^t",
+        "N(x1)",
+        "a_due(x1)[n1]",
+        "A(x1)[n1]",
+        "EA(x1)[n1]",
+        "NP(x1)[n1]",
+        "IEA(x1)[n1]",
+        "a_due(x1)",
+        "A(x1)",
+        "NP(x1)",
+    ],
+)
+def test_sensitivities_match_finite_differences(column):
+    first = calc.sensitivity(column)
+    second = calc.sensitivity(column, order=2)
+    for bumped in (calc, up, down):
+        bumped.populate(column)
+    for t in (0, 5, 9, 20):
+        slope = (up[column].iloc[t] - down[column].iloc[t]) / (2 * bump)
+        curvature = (
+            up[column].iloc[t] - 2 * calc[column].iloc[t] + down[column].iloc[t]
+        ) / bump ** 2
+        assert first.iloc[t] == pytest.approx(slope, rel=1e-5, abs=1e-9)
+        assert second.iloc[t] == pytest.approx(curvature, rel=1e-4, abs=1e-6)
+
+
+def test_term_sensitivities_stop_at_end_of_term():
+    sensitivity = calc.sensitivity("a_due(x1)[n1]")
+    assert sensitivity.iloc[10] == 0
+    assert sensitivity.iloc[20] == 0
+
+
+def test_sensitivity_reuses_calculated_columns():
+    fresh = get_calc()
+    fresh.populate("a_due(x1)[n1]")
+    plan = fresh.plan("da_due(x1)[n1]/di")
+    assert "N(x1)" not in [step.column for step in plan]
+    assert [step.column for step in plan][-1] == "da_due(x1)[n1]/di"
+
+
+def test_sensitivity_order():
+    with pytest.raises(ActyMathError):
+        calc.sensitivity("a_due(x1)[n1]", order=3)
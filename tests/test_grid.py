@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from actymath import Calc
+from actymath.exceptions import ActyMathError
+from actymath.tables import A1967_70_Exams
+
+table = A1967_70_Exams()
+terms = [1, 5, 17, 40]
+
+
+def get_calc():
+    calc = Calc()
+    calc.add_life(45, table.qx(45, select=True))
+    calc.add_i(rate=0.04)
+    for n in terms:
+        calc.add_term(n=n)
+    return calc
+
+
+@pytest.mark.parametrize(
+    "factor", ["a_due", "a", "A", "E", "EA", "NP", "Ia_due", "Ia", "IA", "IE", "IEA"]
+)
+def test_term_grid_matches_term_columns(factor):
+    calc = get_calc()
+    grid = calc.term_grid(factor, max_n=40)
+    assert grid.shape == (len(calc), 40)
+    for term_id, n in enumerate(terms, start=1):
+        column = f"{factor}(x1)[n{term_id}]"
+        calc.populate(column)
+        np.testing.assert_allclose(grid[n], calc[column], rtol=1e-12, atol=1e-15)
+
+
+def test_term_grid_is_upper_triangular():
+    grid = get_calc().term_grid("a_due", max_n=10)
+    values = grid.to_numpy()
+    assert (np.tril(values[:11], -1) == 0).all()
+    assert (values[11:] == 0).all()
+    assert list(grid.columns) == list(range(1, 11))
+
+
+def test_term_grid_does_not_add_terms():
+    calc = get_calc()
+    columns = list(calc.columns)
+    calc.term_grid("EA", max_n=20)
+    assert not [column for column in calc.columns if column not in columns and "[n" in column]
+
+
+def test_term_grid_errors():
+    calc = get_calc()
+    with pytest.raises(ActyMathError):
+        calc.term_grid("a_due", max_n=len(calc))
+    with pytest.raises(ActyMathError):
+        calc.term_grid("unknown", max_n=10)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from actymath.indexers import SliceNIndexer, SliceToEndIndexer
+from actymath.kernels import shift, tail_sum, window_sum
+
+values = np.array([1.5, np.nan, 2.0, 4.25, np.nan, 0.5, np.nan])
+
+
+def test_tail_sum_matches_rolling_to_end():
+    expected = pd.Series(values).rolling(SliceToEndIndexer()).sum().to_numpy()
+    np.testing.assert_array_equal(tail_sum(values), expected)
+    assert tail_sum([np.nan, np.nan])[0] == 0.0  # All NaN sums to zero
+
+
+def test_tail_sum_along_last_axis():
+    rows = np.vstack([values, values[::-1]])
+    np.testing.assert_array_equal(tail_sum(rows)[1], tail_sum(values[::-1]))
+
+
+@pytest.mark.parametrize("offset", [0, 1])
+def test_window_sum_matches_rolling_slice_n(offset):
+    n = np.array([2, 3, np.nan, 1, 4, 0, 2])
+    indexer = SliceNIndexer(n=n, offset=offset)
+    expected = pd.Series(values).rolling(indexer, min_periods=0).sum().to_numpy()
+    np.testing.assert_allclose(window_sum(values, n, offset=offset), expected)
+
+
+def test_shift_matches_series_shift():
+    for periods in (-2, -1, 0, 1):
+        expected = pd.Series(values).shift(periods).to_numpy()
+        np.testing.assert_array_equal(shift(values, periods), expected)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from actymath.exceptions import ActyMathError
+from actymath.model_points import ModelPoints
+from actymath.portfolio import Portfolio
+from actymath.tables import AMC00, A1967_70_Exams
+
+rng = np.random.default_rng(5)
+size = 200
+policies = pd.DataFrame(
+    {
+        "age": rng.choice([30, 40, 50], size),
+        "term": rng.choice([5, 10], size),
+        "rate": rng.choice([0.03, 0.04], size),
+        "sum_assured": rng.integers(1, 100, size) * 1000.0,
+    }
+)
+columns = ["a_due(x1)[n1]", "A(x1)[n1]", "NP(x1)[n1]", "IA(x1)[n1]"]
+
+
+def test_model_points_match_portfolio():
+    model_points = ModelPoints(policies, AMC00)
+    assert len(model_points) == size
+    assert len(model_points.points) == 12
+    assert model_points.compression_ratio == pytest.approx(size / 12)
+    assert "12 model points" in str(model_points)
+
+    expected = Portfolio(
+        policies["age"], policies["term"], policies["rate"], tables=AMC00()
+    ).value(columns)
+    result = model_points.value(columns)
+    assert list(result.index) == list(policies.index)
+    np.testing.assert_allclose(
+        result.to_numpy(),
+        expected.to_numpy() * policies["sum_assured"].to_numpy()[:, None],
+        rtol=1e-10,
+    )
+
+    units = model_points.unit_values(columns)
+    assert list(units.columns) == ["table", "age", "select", "term", "rate"] + columns
+
+
+def test_model_points_with_tables_by_key():
+    frame = policies.assign(table=rng.choice(["AMC00", "A67"], size)).drop(columns="sum_assured")
+    tables = {"AMC00": AMC00(), "A67": A1967_70_Exams()}
+    model_points = ModelPoints(frame, tables, rate=0.04)
+    assert len(model_points.points) == 12
+    result = model_points.value(["NP(x1)[n1]"])
+    for key, table in tables.items():
+        rows = frame["table"] == key
+        expected = Portfolio(
+            frame["age"][rows], frame["term"][rows], 0.04, tables=table
+        ).value(["NP(x1)[n1]"])
+        np.testing.assert_allclose(result["NP(x1)[n1]"][rows], expected["NP(x1)[n1]"], rtol=1e-10)
+
+    with pytest.raises(ActyMathError):
+        ModelPoints(frame, {"AMC00": AMC00()}, rate=0.04)
@@ -1,3 +1,7 @@
+import os
+import shutil
+
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -75,3 +79,119 @@ def test_csv_custom_table_creation():
     assert table.qx(30)[0] == 0.000531
 
 
+def test_commutation_table_reads_views_for_any_age():
+    table = A1967_70()
+    commutation = table.commutation_table(0.04)
+    assert table.commutation_table(0.04) is commutation  # Only built once per rate
+    views, start = commutation.at(table.ultimate_index(30))
+    assert np.shares_memory(views["N"], commutation.columns["N"])
+    assert views["D"][0] == start
+    assert len(views["D"]) == len(table.qx(30, select=False))
+    # Rescaled to start from the l(x) base, without copying the column
+    view, scale = commutation.column("D", table.ultimate_index(30), 1000.0)
+    assert np.shares_memory(view, commutation.columns["D"])
+    assert view[0] * scale == pytest.approx(1000.0)
+
+
+def test_commutation_tables_keep_most_recently_used_rates():
+    table = AMC00()
+    first = table.commutation_table(0.01)
+    for rate in range(2, table.max_commutation_tables + 1):
+        table.commutation_table(rate / 100)
+    assert table.commutation_table(0.01) is first  # Now the most recently used
+    table.commutation_table(0.5)
+    assert len(table._commutation_tables) == table.max_commutation_tables
+    assert 0.02 not in table._commutation_tables
+    assert table.commutation_table(0.01) is first
+
+
+def test_repeated_select_reads_do_not_change_the_table():
+    table = A1967_70_Exams()
+    first = table.qx(30, select=True)
+    second = table.qx(30, select=True)
+    assert len(first) == len(second)
+    assert (first == second).all()
+    assert table.data.shape[1] == 3
+
+
+def test_ultimate_reads_are_read_only_views():
+    table = AMC00()
+    q30 = table.qx(30, select=False)
+    assert np.shares_memory(q30, table.data)
+    with pytest.raises(ValueError):
+        q30[0] = 1.0
+    one_dimension = TestTable()
+    assert np.shares_memory(one_dimension.qx(30), one_dimension.data)
+
+
+def test_select_reads_gather_diagonal():
+    table = A1967_70()
+    q30 = table.qx(30, select=True)
+    row = table.age_index[30]
+    assert q30[0] == table.data[row, 0]
+    assert q30[1] == table.data[row + 1, 1]
+    assert q30[2] == table.data[row + 2, 2]
+
+
+def test_binary_cache_memory_maps_later_loads(tmp_path):
+    shutil.copy("actymath/table_data/test.csv", tmp_path / "test.csv")
+
+    def memory_mapped(values):
+        while values is not None:
+            if isinstance(values, np.memmap):
+                return True
+            values = values.base
+        return False
+
+    class CachedTable(OneDimensionTableMixIn, CSVMortalityTable):
+        path = str(tmp_path)
+        filename = "test.csv"
+        cache_path = str(tmp_path / "cache")
+        age_column = "Age x"
+        table_type = "qx"
+        value_columns = ["q x"]
+
+    first = CachedTable()
+    assert not memory_mapped(first.data)  # Parsed from CSV
+    assert len(os.listdir(tmp_path / "cache")) == 2  # .npy and .json header
+
+    second = CachedTable()
+    assert memory_mapped(second.data)
+    assert second.data.flags.c_contiguous
+    assert first.data.flags.c_contiguous
+    assert (second.qx(30) == first.qx(30)).all()
+
+    # Touching the CSV without changing it still uses the binary copy
+    stat = os.stat(tmp_path / "test.csv")
+    os.utime(tmp_path / "test.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert memory_mapped(CachedTable().data)
+
+    # Changing the CSV rebuilds the binary copy
+    with open(tmp_path / "test.csv") as f:
+        content = f.read()
+    with open(tmp_path / "test.csv", "w") as f:
+        f.write(content.replace("30,0.000531", "30,0.5"))
+    assert CachedTable().qx(30)[0] == 0.5
+    assert CachedTable().qx(30)[0] == 0.5
+
+
+def test_binary_copies_saved_in_cache_dir(cache_dir):
+    """ ACTYMATH_CACHE_DIR is set to a temporary directory for each test in conftest.py """
+    TestTable()
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_table_dtype():
+    table = AMC00(dtype="float32")
+    assert table.qx(40).dtype == "float32"
+    assert table.qx(40, select=False).dtype == "float32"
+    assert table.cache_key != AMC00().cache_key
+
+    # l(x) tables keep float64 values and only convert the q(x)
+    table = A1967_70_Exams(dtype="float32")
+    assert table.data.dtype == "float64"
+    assert table.qx(40).dtype == "float32"
+    assert table.qx(40)[0] == pytest.approx(A1967_70_Exams().qx(40)[0], rel=1e-7)
+
+    with pytest.raises(MortalityTableError):
+        AMC00(dtype="int64")
@@ -0,0 +1,42 @@
+import numpy as np
+from actymath.parallel import SharedArray, value_portfolio
+from actymath.portfolio import Portfolio
+from actymath.tables import AMC00, A1967_70
+
+
+def test_shared_array_attaches_without_copying():
+    published = SharedArray(np.arange(6.0).reshape(2, 3))
+    attached = SharedArray(spec=published.spec)
+    attached.array[1, 2] = 99.0
+    assert published.array[1, 2] == 99.0
+    attached.close()
+    published.close()
+
+
+def test_value_portfolio_matches_portfolio():
+    rng = np.random.default_rng(1)
+    size = 200
+    ages = rng.integers(20, 60, size)
+    terms = rng.integers(5, 30, size)
+    rates = rng.choice([0.03, 0.04], size)
+    table_ids = rng.integers(0, 2, size)
+    tables = [AMC00(), A1967_70()]
+    columns = ["a_due(x1)[n1]", "A(x1)[n1]", "NP(x1)[n1]"]
+
+    result = value_portfolio(
+        ages, terms, rates, tables, columns, table_ids=table_ids, workers=2, chunk_size=30
+    )
+    expected = Portfolio(
+        ages, terms, rates, tables=[tables[index] for index in table_ids]
+    ).value(columns)
+    assert list(result.columns) == columns
+    np.testing.assert_array_equal(result.values, expected.values)
+
+
+def test_value_portfolio_keeps_float32_tables():
+    ages = np.array([30, 40, 50])
+    tables = [AMC00(dtype=np.float32)]
+    columns = ["a_due(x1)[n1]", "A(x1)[n1]"]
+    result = value_portfolio(ages, 10, 0.04, tables, columns, workers=1, dtype=np.float32)
+    expected = Portfolio(ages, 10, 0.04, tables=tables[0], dtype=np.float32).value(columns)
+    np.testing.assert_array_equal(result.values, expected.values)
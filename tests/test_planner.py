@@ -0,0 +1,131 @@
+from collections import Counter
+
+import pytest
+from actymath import Calc, columns
+from actymath.exceptions import ActyMathError
+from actymath.tables import AMC00
+
+table = AMC00()
+
+
+def get_calc(lives=5, terms=20):
+    calc = Calc()
+    for life in range(lives):
+        calc.add_life(30 + life, table.qx(30 + life)[:70])
+    calc.add_i(rate=0.04)
+    for term in range(terms):
+        calc.add_term(n=term + 5)
+    return calc
+
+
+def count_inserts(monkeypatch):
+    """ Counts each column inserted into a Calc. """
+    counts = Counter()
+    insert = columns.base.Column.insert.__func__
+
+    def counting_insert(cls, calc, **kwargs):
+        counts[cls.column(**kwargs)] += 1
+        return insert(cls, calc, **kwargs)
+
+    monkeypatch.setattr(columns.base.Column, "insert", classmethod(counting_insert))
+    return counts
+
+
+def test_plan_is_in_dependency_order():
+    calc = get_calc(lives=1, terms=1)
+    plan = calc.plan("A(x1)[n1]")
+    order = [step.column for step in plan]
+    assert order.index("v^t") < order.index("C(x1)") < order.index("M(x1)")
+    assert order.index("l(x1)") < order.index("d(x1)") < order.index("C(x1)")
+    assert order[-1] == "A(x1)[n1]"
+    assert "q(x1)" not in order  # Inputs already exist
+
+
+def test_populate_many_columns_does_no_redundant_work(monkeypatch):
+    calc = get_calc()
+    counts = count_inserts(monkeypatch)
+    requested = [
+        f"NP(x{life})[n{term}]" for life in range(1, 6) for term in range(1, 21)
+    ]
+    calc.populate(requested)
+    assert all(count == 1 for count in counts.values())
+    assert counts["v^t"] == 1
+    assert counts["D(x3)"] == 1
+    assert all(column in calc.columns for column in requested)
+
+    # Forcing a recalculation still calculates each column only once
+    counts.clear()
+    calc.populate(requested, force=True)
+    assert all(count == 1 for count in counts.values())
+    assert len(counts) == 1 + 6 * 5 + 3 * 100  # v^t, life columns, term columns
+
+
+def test_force_does_not_recalculate_inputs():
+    calc = get_calc(lives=1, terms=1)
+    calc.populate("a_due(x1)[n1]")
+    before = calc["a_due(x1)[n1]"].copy()
+    calc.populate("a_due(x1)[n1]", force=True)
+    assert (calc["a_due(x1)[n1]"] == before).all()
+
+
+def test_explain_prints_plan_with_cost(capsys):
+    calc = get_calc(lives=1, terms=1)
+    plan = calc.explain(["a_due(x1)[n1]", "A(x1)[n1]"])
+    output = capsys.readouterr().out
+    assert "estimated cost" in output
+    assert "N(x1)" in output
+    assert plan.total_cost > 0
+    assert "a_due(x1)[n1]" not in calc.columns  # Explain does not calculate
+
+
+def test_plan_missing_input_raises_error():
+    calc = get_calc(lives=1, terms=1)
+    with pytest.raises(ActyMathError):
+        calc.plan("A(x2)[n1]")
+    calc = Calc()
+    calc.add_life(30, table.qx(30))
+    with pytest.raises(ActyMathError):
+        calc.plan("v^t")  # No interest rate added
+
+
+def test_populate_keep_outputs_drops_intermediates():
+    calc = get_calc(lives=2, terms=2)
+    inputs = list(calc.columns)
+    requested = ["NP(x1)[n1]", "IA(x2)[n2]", "dA(x1)[n2]/di"]
+    full = get_calc(lives=2, terms=2)
+    full.populate(requested)
+
+    plan = calc.plan(requested, keep="outputs")
+    assert plan.peak_columns < get_calc(lives=2, terms=2).plan(requested).peak_columns
+    assert len(plan.drops) < len(plan.releases)  # Dropped in batches
+    assert "drop" in plan.explain()
+
+    with calc.profile() as profile:
+        calc.populate(requested, keep="outputs")
+    assert profile.peak_bytes == plan.peak_bytes  # The buffer actually allocated
+    assert calc._store.nbytes < full._store.nbytes  # Memory is freed
+    assert list(calc.columns) == inputs + requested
+    for column in requested:
+        assert (calc[column] == full[column]).all()
+
+
+def test_peak_bytes_in_column_precision():
+    requested = ["NP(x1)[n1]"]
+    plans = {}
+    for dtype in ["float32", "float64"]:
+        calc = Calc(column_dtype=dtype)
+        calc.add_life(30, table.qx(30))
+        calc.add_i(rate=0.04)
+        calc.add_term(n=10)
+        plans[dtype] = calc.plan(requested)
+    assert plans["float32"].peak_bytes * 2 == plans["float64"].peak_bytes
+
+
+def test_populate_keep_pattern_and_existing_columns():
+    calc = get_calc(lives=1, terms=1)
+    calc.populate("v^t")
+    calc.populate("A(x1)[n1]", keep=r"^D\(")
+    assert "v^t" in calc.columns  # Already in the Calc before
+    assert "D(x1)" in calc.columns
+    assert "M(x1)" not in calc.columns
+    assert "A(x1)[n1]" in calc.columns
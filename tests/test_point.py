@@ -0,0 +1,41 @@
+import pytest
+from actymath import Calc
+from actymath.exceptions import ActyMathError
+from actymath.point import FACTORS, point_values, quote
+from actymath.tables import AMC00, A1967_70_Exams
+
+table = A1967_70_Exams()
+
+
+@pytest.mark.parametrize(
+    "age, n, rate",
+    [(45, 10, 0.04), (30, 40, 0.03), (60, 1, 0.05), (45, 20, [0.02, 0.03, 0.04])],
+)
+def test_point_values_match_calc(age, n, rate):
+    calc = Calc()
+    calc.add_life(age, table.qx(age))
+    calc.add_i(rate=rate)
+    calc.add_term(n=n)
+    values = quote(table, age, n, rate)
+    assert list(values) == FACTORS
+    for factor in FACTORS:
+        column = f"{factor}(x1)[n1]"
+        calc.populate(column)
+        assert values[factor] == pytest.approx(calc[column].iloc[0], rel=1e-12)
+
+
+def test_point_values_green_tables():
+    values = quote(table, 45, 10, 0.04, factors=["a_due", "EA", "NP"])
+    assert list(values) == ["a_due", "EA", "NP"]
+    assert values["a_due"] == pytest.approx(8.317, abs=0.001)
+    assert values["EA"] == pytest.approx(0.68013, abs=0.00001)
+    assert values["NP"] == pytest.approx(0.08178, abs=0.00001)
+
+
+def test_point_values_term_in_range():
+    qx = AMC00().qx(40)
+    point_values(qx, len(qx) - 1, 0.04)
+    with pytest.raises(ActyMathError):
+        point_values(qx, len(qx), 0.04)
+    with pytest.raises(ActyMathError):
+        point_values(qx, 0, 0.04)
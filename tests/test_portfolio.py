@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from actymath import Calc
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+from actymath.tables import AMC00, A1967_70_Exams
+
+table = A1967_70_Exams()
+ages = [30, 45, 54, 60]
+terms = [10, 20, 10, 5]
+rates = [0.04, 0.03, 0.04, 0.05]
+
+portfolio = Portfolio(ages=ages, terms=terms, rates=rates, tables=table)
+
+
+def assert_matches(actual, desired):
+    """ The Calc columns and the Portfolio share the same kernels so should match exactly. """
+    np.testing.assert_array_equal(actual, desired)
+
+
+def get_calc(age, term, rate, select=True, table=table):
+    calc = Calc()
+    calc.add_life(age, table.qx(age, select=select))
+    calc.add_i(rate=rate)
+    calc.add_term(n=term)
+    return calc
+
+
+@pytest.mark.parametrize(
+    "column",
+    [
+        "l(x1)",
+        "d(x1)",
+        "v^t",
+        "C(x1)",
+        "D(x1)",
+        "M(x1)",
+        "N(x1)",
+        "R(x1)",
+        "S(x1)",
+        "a_due(x1)[n1]",
+        "a(x1)[n1]",
+        "A(x1)[n1]",
+        "E(x1)[n1]",
+        "EA(x1)[n1]",
+        "NP(x1)[n1]",
+        "Ia_due(x1)[n1]",
+        "Ia(x1)[n1]",
+        "IA(x1)[n1]",
+        "IE(x1)[n1]",
+        "IEA(x1)[n1]",
+    ],
+)
+def test_portfolio_matches_calc(column):
+    for row, (age, term, rate) in enumerate(zip(ages, terms, rates)):
+        calc = get_calc(age, term, rate)
+        calc.populate(column)
+        length = len(calc)
+        assert np.isnan(portfolio[column][row, length:]).all()  # Padding
+        assert_matches(portfolio[column][row, :length], calc[column].values)
+
+
+def test_portfolio_shares_tables_and_select():
+    amc00 = AMC00()
+    book = Portfolio(
+        ages=[40, 40], terms=15, rates=0.04, tables=amc00, select=[True, False]
+    )
+    for row, select in enumerate([True, False]):
+        calc = get_calc(40, 15, 0.04, select=select, table=amc00)
+        calc.populate("A(x1)[n1]")
+        assert_matches(book["A(x1)[n1]"][row, : len(calc)], calc["A(x1)[n1]"].values)
+
+
+def test_portfolio_value_at_time_zero():
+    book = Portfolio(ages=[45, 45], terms=10, rates=0.04, tables=A1967_70_Exams())
+    result = book.value(["a_due(x1)[n1]", "EA(x1)[n1]"])
+    assert len(result) == 2
+    assert result["a_due(x1)[n1]"].iloc[1] == pytest.approx(8.317, abs=0.001)
+    assert result["EA(x1)[n1]"].iloc[1] == pytest.approx(0.68013, abs=0.00001)
+
+
+def test_portfolio_unknown_column_raises_error():
+    with pytest.raises(ActyMathError):
+        portfolio["Z(x1)"]
+
+
+def test_portfolio_rate_for_each_period_matches_calc():
+    curve = [0.02, 0.025, 0.03, 0.035]
+    curves = Portfolio(
+        ages=ages, terms=terms, rates=[curve] * len(ages), tables=table
+    )
+    for row, (age, term) in enumerate(zip(ages, terms)):
+        calc = Calc()
+        calc.add_life(age, table.qx(age, select=True))
+        calc.add_i(rate=curve)
+        calc.add_term(n=term)
+        for column in ["v^t", "N(x1)", "A(x1)[n1]", "NP(x1)[n1]"]:
+            calc.populate(column)
+            assert_matches(curves[column][row, : len(calc)], calc[column].to_numpy())
+
+
+def test_portfolio_float32():
+    single = Portfolio(ages=ages, terms=terms, rates=rates, tables=table, dtype=np.float32)
+    for column in ["q(x1)", "D(x1)", "NP(x1)[n1]", "a_due(x1)[n1]"]:
+        assert single[column].dtype == np.float32
+        np.testing.assert_allclose(
+            single[column][:, :5], portfolio[column][:, :5], rtol=1e-5
+        )
+    # A one year term at a young age, where M(x) - M(x+1) is small against M(x)
+    young = {
+        dtype: Portfolio([20], [1], 0.04, tables=AMC00(dtype=dtype), dtype=dtype)
+        for dtype in [np.float32, np.float64]
+    }
+    for column in ["A(x1)[n1]", "IA(x1)[n1]", "a_due(x1)[n1]"]:
+        np.testing.assert_allclose(
+            young[np.float32][column][:, 0], young[np.float64][column][:, 0], rtol=1e-6
+        )
@@ -0,0 +1,38 @@
+from actymath import columns
+from actymath.calc import register, resolver
+from actymath.resolver import ColumnResolver
+
+
+def test_resolver_finds_columns_with_kwargs():
+    assert resolver.resolve("q(x3)") == (columns.q_x, {"life": "3"})
+    assert resolver.resolve("v^t") == (columns.v, {})
+    assert resolver.resolve("i") == (columns.i, {})
+
+
+def test_resolver_keeps_more_specific_first_ordering():
+    """ Term columns would also parse as whole of life columns, e.g. A(x{life}) """
+    assert resolver.resolve("A(x1)[n2]") == (columns.A_x_n, {"life": "1", "term_id": "2"})
+    assert resolver.resolve("A(x1)") == (columns.A_x, {"life": "1"})
+
+
+def test_resolver_matches_linear_parse_scan():
+    names = ["a_due(x1)[n1]", "IEA(x2)[n3]", "Ia(x1)", "l(x12)", "n4", "x2", "t"]
+    for name in names:
+        for class_ in register.values():
+            result = class_.parse_column(name)
+            if result is not None:
+                break
+        assert resolver.resolve(name) == (class_, result[1])
+
+
+def test_resolver_returns_none_for_unknown_columns():
+    assert resolver.resolve("Z(x1)") is None
+    assert resolver.resolve("Q(x1)") is None  # Case sensitive
+    assert resolver.resolve("") is None
+
+
+def test_resolver_memo_returns_copies_of_kwargs():
+    local = ColumnResolver(register)
+    _, kwargs = local.resolve("D(x1)")
+    kwargs["life"] = "2"
+    assert local.resolve("D(x1)") == (columns.Dx, {"life": "1"})
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+from actymath.scenarios import ScenarioCube
+from actymath.tables import A1967_70_Exams
+
+table = A1967_70_Exams()
+ages = [30, 45, 54, 60]
+terms = [10, 20, 10, 5]
+portfolio = Portfolio(ages=ages, terms=terms, rates=0.04, tables=table)
+columns = ["a_due(x1)[n1]", "A(x1)[n1]", "NP(x1)[n1]", "IA(x1)[n1]"]
+
+rng = np.random.default_rng(13)
+scenarios = 0.04 + np.cumsum(rng.normal(0, 0.002, (7, 30)), axis=1)
+
+
+def test_scenarios_match_portfolio_with_each_curve():
+    cube = ScenarioCube(portfolio, scenarios)
+    values = cube.value(columns)
+    assert values.shape == (7, 4, 4)
+    for scenario, curve in enumerate(scenarios):
+        single = Portfolio(
+            ages=ages, terms=terms, rates=[curve] * len(ages), tables=table
+        ).value(columns)
+        np.testing.assert_allclose(values[scenario], single.to_numpy(), rtol=1e-12)
+
+
+def test_scenarios_are_chunked_within_memory_budget():
+    cube = ScenarioCube(portfolio, scenarios, max_bytes=1)
+    assert cube.chunk_size == 1
+    assert len(list(cube.chunks())) == 7
+    np.testing.assert_array_equal(
+        cube.value(columns), ScenarioCube(portfolio, scenarios).value(columns)
+    )
+
+
+def test_scenario_chunks_use_the_portfolio_precision():
+    single = Portfolio(ages=ages, terms=terms, rates=0.04, tables=table, dtype=np.float32)
+    budget = portfolio.valid.size * 8 * 24 * 3
+    assert ScenarioCube(single, scenarios, max_bytes=budget).chunk_size == 6
+    assert ScenarioCube(portfolio, scenarios, max_bytes=budget).chunk_size == 3
+
+
+def test_scenarios_share_mortality_columns():
+    cube = ScenarioCube(portfolio, scenarios)
+    _, _, chunk = next(cube.chunks())
+    assert chunk["l(x1)"] is portfolio["l(x1)"]
+    assert chunk["D(x1)"].shape == (7,) + portfolio.valid.shape
+
+
+def test_scenarios_need_scenario_by_time_rates():
+    with pytest.raises(ActyMathError):
+        ScenarioCube(portfolio, [0.04, 0.05])
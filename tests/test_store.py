@@ -0,0 +1,96 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from actymath import Calc
+from actymath.store import ColumnStore
+from actymath.tables import A1967_70_Exams
+
+table = A1967_70_Exams()
+
+
+def get_calc(terms=20):
+    calc = Calc()
+    calc.add_life(30, table.qx(30, select=True))
+    calc.add_i(rate=0.04)
+    for n in range(1, terms + 1):
+        calc.add_term(n=n)
+    return calc
+
+
+def test_store_grows_and_deletes():
+    store = ColumnStore(3, capacity=2)
+    for number in range(5):
+        store.set(f"c{number}", np.full(3, float(number)))
+    assert len(store) == 5
+    assert store.capacity == 8
+    frame = store.frame(pd.RangeIndex(3))
+    assert list(frame.columns) == ["c0", "c1", "c2", "c3", "c4"]
+    assert np.shares_memory(frame.to_numpy(), store.buffer)
+
+    kept = frame["c4"]
+    store.delete(["c1", "c3"])
+    assert "c1" not in store and "c4" in store
+    assert list(store.frame(pd.RangeIndex(3)).columns) == ["c0", "c2", "c4"]
+    assert store.capacity == 4  # Shrinks to free the memory
+    assert (kept == 4).all()  # Earlier reads keep their values
+
+
+def test_calc_columns_are_one_block():
+    calc = get_calc()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.PerformanceWarning)
+        calc.populate([f"NP(x1)[n{term_id}]" for term_id in range(1, 21)])
+    assert calc._mgr.nblocks == 1
+    assert (calc.dtypes == np.float64).all()
+    assert np.shares_memory(calc.to_numpy(), calc._store.buffer)
+
+
+def test_calc_values_unchanged_by_store():
+    calc = get_calc(terms=1)
+    calc.populate("A(x1)[n1]")
+    frame = pd.DataFrame(calc)  # Plain DataFrame with no store
+    frame["x"] = frame["D(x1)"] * 2
+    calc["x"] = calc["D(x1)"] * 2
+    np.testing.assert_array_equal(calc["x"], frame["x"])
+
+    del calc["x"]
+    assert "x" not in calc.columns
+    calc.invalidate("D(x1)")
+    assert "A(x1)[n1]" not in calc.columns
+    assert calc._mgr.nblocks == 1
+
+
+def test_calc_falls_back_to_pandas_for_other_dtypes():
+    calc = get_calc(terms=1)
+    calc["label"] = "policy"
+    calc.populate("a_due(x1)[n1]")
+    assert calc["label"].iloc[0] == "policy"
+    assert calc["a_due(x1)[n1]"].iloc[0] > 0
+
+    # Changes made through pandas are picked up again
+    calc.drop(columns=["label"], inplace=True)
+    calc.populate("A(x1)[n1]")
+    assert calc._store is not None
+    assert "a_due(x1)[n1]" in calc._store
+
+
+def test_replacing_a_column_keeps_earlier_reads():
+    store = ColumnStore(3, capacity=4)
+    store.set("a", np.zeros(3))
+    kept = store.frame(pd.RangeIndex(3))["a"]
+    store.set("a", np.ones(3))
+    assert (kept == 0).all()
+    assert (store.frame(pd.RangeIndex(3))["a"] == 1).all()
+
+    calc = get_calc(terms=1)
+    calc.populate("A(x1)[n1]")
+    rate, q, D = calc["i"], calc["q(x1)"], calc["D(x1)"]
+    expected = rate.copy(), q.copy(), D.copy()
+
+    calc.set_i(rate=0.05)
+    calc.update_life(1, qx=table.qx(30, select=True) * 2)
+    calc.populate("D(x1)", force=True)
+    assert (calc["i"] == 0.05).all()
+    for read, values in zip([rate, q, D], expected):
+        np.testing.assert_array_equal(read, values)
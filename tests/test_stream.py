@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from actymath.exceptions import ActyMathError
+from actymath.portfolio import Portfolio
+from actymath.stream import select_flags, value_policies, value_policy_file
+from actymath.tables import AMC00
+
+rng = np.random.default_rng(2)
+policies = pd.DataFrame(
+    {
+        "id": range(25),
+        "age": rng.integers(20, 60, 25),
+        "term": rng.integers(5, 30, 25),
+        "rate": rng.choice([0.03, 0.04], 25),
+    }
+)
+expected = Portfolio(
+    policies["age"], policies["term"], policies["rate"], tables=AMC00()
+).value(["a_due(x1)[n1]", "NP(x1)[n1]"])
+
+
+def test_value_policies_in_chunks(tmp_path):
+    path = tmp_path / "policies.csv"
+    policies.to_csv(path, index=False)
+    chunks = list(
+        value_policies(path, AMC00, columns=["a_due(x1)[n1]", "NP(x1)[n1]"], chunk_size=10)
+    )
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    result = pd.concat(chunks)
+    assert list(result["id"]) == list(range(25))
+    np.testing.assert_allclose(result["a_due(x1)[n1]"], expected["a_due(x1)[n1]"])
+    np.testing.assert_allclose(result["NP(x1)[n1]"], expected["NP(x1)[n1]"])
+
+
+def test_value_policy_file_writes_results(tmp_path):
+    path = tmp_path / "policies.csv"
+    output = tmp_path / "values.csv"
+    policies.drop(columns="rate").to_csv(path, index=False)
+    count = value_policy_file(path, output, AMC00(), rate=0.04, chunk_size=7)
+    assert count == 25
+    result = pd.read_csv(output)
+    assert len(result) == 25
+    assert "EA(x1)[n1]" in result.columns
+
+
+def test_select_flags_read_explicitly(tmp_path):
+    path = tmp_path / "policies.csv"
+    flagged = policies.assign(select=["Y", "N", "True", "False", "1"] * 5)
+    flagged.to_csv(path, index=False)
+    result = pd.concat(value_policies(path, AMC00, columns=["a_due(x1)[n1]"]))
+    select = Portfolio(
+        policies["age"],
+        policies["term"],
+        policies["rate"],
+        tables=AMC00(),
+        select=np.array([True, False, True, False, True] * 5),
+    ).value(["a_due(x1)[n1]"])
+    np.testing.assert_allclose(result["a_due(x1)[n1]"], select["a_due(x1)[n1]"])
+    assert (select_flags(pd.Series([1, 0])) == [True, False]).all()
+    assert (select_flags(pd.Series([True, False])) == [True, False]).all()
+
+
+def test_unknown_select_flags_raise_error(tmp_path):
+    path = tmp_path / "policies.csv"
+    policies.assign(select="maybe").to_csv(path, index=False)
+    with pytest.raises(ActyMathError):
+        next(value_policies(path, AMC00))